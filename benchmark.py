@@ -0,0 +1,66 @@
+from argparse import ArgumentParser
+
+from src.benchmark import Benchmark
+from src.tracer import tracer
+
+parser = ArgumentParser(description='Benchmark the pipeline over a set of instances')
+
+parser.add_argument('instances', nargs='+', help='Instance files or directories (e.g. instances/solomon_25)')
+parser.add_argument('-k', '--k-neighbors', type=int, default=5, help='Number of neighbors')
+parser.add_argument('-v', '--vehicle-number', type=int, default=None, help='Number of vehicles (default: search from the minimum)')
+parser.add_argument('--temporal', action='store_true', help='Rank neighbors by distance and waiting time, dropping time infeasible arcs')
+parser.add_argument('--random-state', type=int, default=0, help='KMeans random state')
+parser.add_argument('--time-limit', type=int, default=100, help='Clasp time limit (seconds)')
+parser.add_argument('--gap', type=float, default=None, help='Stop clasp once the incumbent is within this relative gap of a lower bound')
+parser.add_argument('--encoding', choices=['mtz', 'lima', 'auto'], default='mtz', help='Subtour elimination encoding (auto picks the smallest one)')
+parser.add_argument('--memory-budget', type=int, default=None, help='Estimated memory allowed for the model (MB), downgrading the encoding if needed')
+parser.add_argument('--no-solver', action='store_true', help='Skip the model and clasp stages')
+parser.add_argument('--memory', action='store_true', help='Record peak memory of each stage (slower)')
+parser.add_argument('--best-known', default='instances/best_known.json', help='Best known costs (JSON)')
+parser.add_argument('--route-cache', type=int, default=None, help='Route evaluations cache capacity (default: disabled, it does not pay off on the Solomon instances)')
+parser.add_argument('--trace', default=None, help='Trace file (JSON, Chrome trace event format) with nested spans and counters')
+parser.add_argument('-o', '--output', action='append', default=[], help='Output file (.json or .csv), can be repeated')
+parser.add_argument('--baseline', default=None, help='Baseline JSON to compare against')
+parser.add_argument('--tolerance', type=float, default=0.2, help='Relative slowdown flagged as regression')
+
+args = parser.parse_args()
+
+files: list[str] = []
+for instance in args.instances:
+    files += [instance] if instance.endswith('.txt') else Benchmark.instances(instance)
+
+benchmark = Benchmark(
+    files,
+    args.k_neighbors,
+    vehicle_number=args.vehicle_number,
+    random_state=args.random_state,
+    use_solver=not args.no_solver,
+    time_limit=args.time_limit,
+    trace_memory=args.memory,
+    best_known=args.best_known,
+    route_cache=args.route_cache,
+    temporal_neighbors=args.temporal,
+    solver_gap=args.gap,
+    use_lima={'mtz': False, 'lima': True, 'auto': None}[args.encoding],
+    memory_budget=args.memory_budget * 2 ** 20 if args.memory_budget is not None else None
+)
+
+if args.trace is not None:
+    tracer.enable(trace_memory=args.memory)
+
+benchmark.run()
+
+if args.trace is not None:
+    tracer.export(args.trace)
+
+for output in args.output:
+    benchmark.save(output)
+
+if args.baseline is not None:
+    regressions = benchmark.compare(args.baseline, tolerance=args.tolerance)
+
+    for regression in regressions:
+        print(f'REGRESSION {regression}')
+
+    if regressions:
+        exit(1)
@@ -1,34 +1,83 @@
 from src.data import Data
 from src.k_means import KMeans
+from src.fleet_search import FleetSearch
 from src.two_opt import TwoOpt
+from src.local_search import LocalSearch
 from src.k_neighbors import KNeighbors
 from src.solver import Solver
+from src.checkpoint import Checkpoint
+from src.renderer import Renderer
 
 from src.utils import plot
 
 from sys import argv
 
 if len(argv) < 4:
-    print('Usage: python main.py <instance_file> <vehicle_number> <k_neighbors>')
+    print('Usage: python main.py <instance_file> <vehicle_number|auto> <k_neighbors> [<plot_directory>|none]')
     exit(1)
 
 data = Data(argv[1]).load()
 
-km_time, km_routes = KMeans(data, int(argv[2]), random_state=0).run()
-to_time, to_routes = TwoOpt(km_routes).run()
-kn_time, matrices = KNeighbors(data, int(argv[3]), to_routes).run()
+# Each stage output is saved under a key of its input and parameters
+store = Checkpoint()
+
+instance_key = Checkpoint.instance_key(argv[1])
+
+if argv[2] == 'auto':
+    # The smallest number of vehicles with feasible KMeans routes (after the local search repair)
+    km_key = Checkpoint.key(instance_key, 'fleet_search', random_state=0)
+else:
+    km_key = Checkpoint.key(instance_key, 'k_means', n_clusters=int(argv[2]), random_state=0)
+
+to_key = Checkpoint.key(km_key, 'two_opt')
+ls_key = Checkpoint.key(to_key, 'local_search', k=10)
+kn_key = Checkpoint.key(ls_key, 'k_neighbors', k=int(argv[3]))
+# Solver parameters (part of the solver key)
+use_lima = False
+time_limit = 100
+
+solver_key = Checkpoint.key(kn_key, 'solver', encoding='lima' if use_lima else 'mtz', time_limit=time_limit)
+
+# Plots are shown at the end, saved by a background process to the given directory or skipped (none)
+plots = argv[4] if len(argv) > 4 else None
+
+renderer = Renderer(plots, enabled=plots not in (None, 'none'))
+renderer.start()
+
+if argv[2] == 'auto':
+    km_routes = store.routes(data, km_key, lambda: FleetSearch(data, random_state=0).run()[2])
+
+    print(f'{len(km_routes)} vehicles')
+else:
+    km_routes = store.routes(data, km_key, lambda: KMeans(data, int(argv[2]), random_state=0).run()[1])
+
+renderer.submit(data, km_routes, 'k_means')
+
+to_routes = store.routes(data, to_key, lambda: TwoOpt(km_routes).run()[1])
+renderer.submit(data, to_routes, 'two_opt')
+
+ls_routes = store.routes(data, ls_key, lambda: LocalSearch(data, to_routes, 10).run()[1])
+renderer.submit(data, ls_routes, 'local_search')
+
+matrices = store.matrices(kn_key, lambda: KNeighbors(data, int(argv[3]), ls_routes).run()[1])
 
 km_cost = sum(route.cost for route in km_routes)
 to_cost = sum(route.cost for route in to_routes)
+ls_cost = sum(route.cost for route in ls_routes)
 
-print(f'{km_cost} -> {to_cost}')
+print(f'{km_cost} -> {to_cost} -> {ls_cost}')
 
-solver_time, solver_routes = Solver(data, matrices).run()
+solver_routes = store.routes(data, solver_key, lambda: Solver(data, matrices, use_lima, time_limit).run()[1])
+renderer.submit(data, solver_routes, 'solver')
 
 solver_cost = sum(route.cost for route in solver_routes)
 
-print(f'{to_cost} -> {solver_cost}')
+print(f'{ls_cost} -> {solver_cost}')
+
+renderer.close()
 
-plot(data, km_routes)
-plot(data, to_routes)
-plot(data, solver_routes)
\ No newline at end of file
+if plots is None:
+    plot(data, km_routes)
+    plot(data, to_routes)
+    plot(data, ls_routes)
+    plot(data, solver_routes)
\ No newline at end of file
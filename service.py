@@ -0,0 +1,80 @@
+import json
+import asyncio
+
+from argparse import ArgumentParser
+
+from src.service import SolveService
+
+parser = ArgumentParser(description='Serve the pipeline over HTTP (POST /solve with a JSON request)')
+
+parser.add_argument('--host', default='127.0.0.1', help='Host to listen on')
+parser.add_argument('--port', type=int, default=8000, help='Port to listen on')
+parser.add_argument('--max-solves', type=int, default=1, help='Clasp processes running at once')
+parser.add_argument('--max-workers', type=int, default=None, help='Worker processes for the heuristics')
+parser.add_argument('--time-limit', type=int, default=100, help='Clasp time limit (seconds)')
+
+args = parser.parse_args()
+
+async def respond(writer: asyncio.StreamWriter, status: str, body: dict):
+    ''' Write a JSON response and close the connection '''
+
+    content = json.dumps(body).encode()
+
+    writer.write(f'HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(content)}\r\n\r\n'.encode())
+    writer.write(content)
+
+    await writer.drain()
+
+    writer.close()
+
+async def handle(service: SolveService, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    ''' Handle a request: {"instance": file or {name, max_vehicle_number, vehicle_capacity, rows}, "vehicle_number", "k_neighbors", "deadline"} '''
+
+    try:
+        method, target, _ = (await reader.readline()).decode().split(' ', 2)
+
+        length = 0
+        while (line := (await reader.readline()).decode().strip()):
+            name, _, value = line.partition(':')
+
+            if name.lower() == 'content-length':
+                length = int(value)
+
+        if method != 'POST' or target != '/solve':
+            return await respond(writer, '404 Not Found', {'error': 'POST /solve'})
+
+        request = json.loads(await reader.readexactly(length))
+
+        if not isinstance(request, dict):
+            raise ValueError('the body must be a JSON object')
+
+        instance = request['instance']
+    except KeyError as e:
+        return await respond(writer, '400 Bad Request', {'error': f'Missing field {e}'})
+    except (ValueError, asyncio.IncompleteReadError) as e:
+        return await respond(writer, '400 Bad Request', {'error': f'Malformed request: {e}'})
+
+    try:
+        result = await service.solve(
+            instance,
+            vehicle_number=request.get('vehicle_number'),
+            k_neighbors=request.get('k_neighbors', 5),
+            deadline=request.get('deadline')
+        )
+    except asyncio.TimeoutError:
+        return await respond(writer, '504 Gateway Timeout', {'error': 'Deadline exceeded'})
+    except Exception as e:
+        return await respond(writer, '500 Internal Server Error', {'error': str(e)})
+
+    await respond(writer, '200 OK', result)
+
+async def main():
+    async with SolveService(args.max_solves, args.max_workers, args.time_limit) as service:
+        server = await asyncio.start_server(lambda r, w: handle(service, r, w), args.host, args.port)
+
+        print(f'Listening on http://{args.host}:{args.port}/solve')
+
+        async with server:
+            await server.serve_forever()
+
+asyncio.run(main())
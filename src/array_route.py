@@ -0,0 +1,375 @@
+import numpy as np
+
+from collections import deque
+
+from src.data import Data
+from src.route import Route
+from src.tracer import tracer
+
+class ArrayRoute:
+    ''' Class for an array-backed route with in-place moves '''
+
+    __slots__ = (
+        'distances', 'demands', 'ready_times', 'due_dates', 'service_times',
+        'capacity', 'horizon', 'value', 'size', 'loads', 'departures', 'cost', 'history'
+    )
+
+    def __init__(self, data: Data, value: list[int]):
+        self.distances = data.distances # Distance matrix
+        self.demands = data.demands # Demand of each customer
+        self.ready_times = data.ready_times # Ready time of each customer
+        self.due_dates = data.due_dates # Due date of each customer
+        self.service_times = data.service_times # Service time of each customer
+
+        self.capacity = data.vehicle_capacity # Vehicle capacity
+        self.horizon = data.depot.due_date # Depot due date
+
+        # Customers between two depot sentinels: [0, c_1, ..., c_size, 0]
+        self.value = np.zeros(len(data.customers) + 1, dtype=int)
+        self.value[1:len(value) + 1] = value
+
+        self.size = len(value) # Number of customers
+
+        self.loads = np.zeros(len(self.value), dtype=int) # Cumulative load at each position
+        self.departures = np.zeros(len(self.value)) # Departure time at each position (inf if late)
+
+        self.cost = self.calculate_cost() # Route cost
+
+        self.history: list[tuple] = [] # Applied moves (for undo)
+
+        self.update(1)
+
+    @staticmethod
+    def from_route(route: Route) -> 'ArrayRoute':
+        ''' Create an array route from a route '''
+
+        return ArrayRoute(route.data, route.value)
+
+    def to_route(self, data: Data) -> Route:
+        ''' Create a route from the array route '''
+
+        return Route(data, self.customers.tolist())
+
+    def __repr__(self):
+        ''' Return the string representation of the route '''
+
+        return f'ArrayRoute{self.customers.tolist()}'
+
+    def __len__(self):
+        ''' Get the length of the route '''
+
+        return self.size
+
+    @property
+    def customers(self) -> np.ndarray:
+        ''' Get the customers of the route (view) '''
+
+        return self.value[1:self.size + 1]
+
+    @property
+    def demand(self):
+        ''' Get the route demand '''
+
+        return self.loads[self.size]
+
+    @property
+    def time(self):
+        ''' Get the route time (arrival at the depot) '''
+
+        return self.departures[self.size + 1]
+
+    @property
+    def feasible(self) -> bool:
+        ''' Check if the route is feasible '''
+
+        return self.demand <= self.capacity and self.time <= self.horizon
+
+    def calculate_cost(self):
+        ''' Calculate the cost for the route '''
+
+        if not self.size:
+            return 0
+
+        return self.distances[self.value[:self.size + 1], self.value[1:self.size + 2]].sum()
+
+    def update(self, start: int):
+        ''' Update the cumulative loads and times from a position '''
+
+        value, end = self.value, self.size + 1
+
+        load = self.loads[start - 1]
+        time = self.departures[start - 1]
+
+        for k in range(start, end + 1):
+            customer = value[k]
+
+            load += self.demands[customer]
+            time += self.distances[value[k - 1], customer]
+
+            if time > self.due_dates[customer]:
+                time = float('inf')
+            elif k < end:
+                time = max(time, self.ready_times[customer]) + self.service_times[customer]
+
+            self.loads[k] = load
+            self.departures[k] = time
+
+    def check(self, k: int, time: float) -> bool:
+        ''' Check if the route is feasible when leaving position k at the time (positions after k unchanged) '''
+
+        value, end = self.value, self.size + 1
+
+        while k < end:
+            k += 1
+
+            # From here the schedule is not later than the current one
+            if time <= self.departures[k - 1] and self.departures[end] <= self.horizon:
+                return True
+
+            time += self.distances[value[k - 1], value[k]]
+
+            if time > self.due_dates[value[k]]:
+                return False
+
+            if k < end:
+                time = max(time, self.ready_times[value[k]]) + self.service_times[value[k]]
+
+        return time <= self.horizon
+
+    def visit(self, time: float, prev: int, customer: int) -> float:
+        ''' Get the departure time from a customer (inf if late) '''
+
+        time += self.distances[prev, customer]
+
+        if time > self.due_dates[customer]:
+            return float('inf')
+
+        return max(time, self.ready_times[customer]) + self.service_times[customer]
+
+    def reversal_delta(self, i: int, j: int):
+        ''' Get the cost change of reversing the positions i..j '''
+
+        value, d = self.value, self.distances
+
+        return d[value[i - 1], value[j]] + d[value[i], value[j + 1]] - d[value[i - 1], value[i]] - d[value[j], value[j + 1]]
+
+    def reversal_feasible(self, i: int, j: int) -> bool:
+        ''' Check if reversing the positions i..j keeps the route feasible '''
+
+        if self.loads[self.size] > self.capacity:
+            return False
+
+        value = self.value
+
+        time = self.departures[i - 1]
+        prev = value[i - 1]
+
+        for k in range(j, i - 1, -1):
+            time = self.visit(time, prev, value[k])
+
+            if time == float('inf'):
+                return False
+
+            prev = value[k]
+
+        # Continue from position j with the reversed segment ending at value[i]
+        time += self.distances[prev, value[j + 1]] - self.distances[value[j], value[j + 1]]
+
+        return self.check(j, time)
+
+    def apply_reversal(self, i: int, j: int, record: bool = True):
+        ''' Reverse the positions i..j in place '''
+
+        self.cost += self.reversal_delta(i, j)
+
+        self.value[i:j + 1] = self.value[i:j + 1][::-1].copy()
+
+        self.update(i)
+
+        if record:
+            self.history.append(('reversal', i, j))
+
+    def insertion_delta(self, idx: int, customer: int):
+        ''' Get the cost change of inserting a customer at the position idx '''
+
+        value, d = self.value, self.distances
+
+        return d[value[idx - 1], customer] + d[customer, value[idx]] - d[value[idx - 1], value[idx]]
+
+    def insertion_feasible(self, idx: int, customer: int) -> bool:
+        ''' Check if inserting a customer at the position idx keeps the route feasible '''
+
+        if self.loads[self.size] + self.demands[customer] > self.capacity:
+            return False
+
+        time = self.visit(self.departures[idx - 1], self.value[idx - 1], customer)
+
+        if time == float('inf'):
+            return False
+
+        # Continue as if leaving position idx - 1 to value[idx]
+        time += self.distances[customer, self.value[idx]] - self.distances[self.value[idx - 1], self.value[idx]]
+
+        return self.check(idx - 1, time)
+
+    def apply_insertion(self, idx: int, customer: int, record: bool = True):
+        ''' Insert a customer at the position idx in place '''
+
+        self.cost += self.insertion_delta(idx, customer)
+
+        self.value[idx + 1:self.size + 3] = self.value[idx:self.size + 2].copy()
+        self.value[idx] = customer
+
+        self.size += 1
+
+        self.update(idx)
+
+        if record:
+            self.history.append(('insertion', idx, customer))
+
+    def removal_delta(self, idx: int):
+        ''' Get the cost change of removing the customer at the position idx '''
+
+        value, d = self.value, self.distances
+
+        return d[value[idx - 1], value[idx + 1]] - d[value[idx - 1], value[idx]] - d[value[idx], value[idx + 1]]
+
+    def apply_removal(self, idx: int, record: bool = True):
+        ''' Remove the customer at the position idx in place '''
+
+        customer = self.value[idx]
+
+        self.cost += self.removal_delta(idx)
+
+        self.value[idx:self.size + 1] = self.value[idx + 1:self.size + 2].copy()
+
+        self.size -= 1
+
+        self.update(idx)
+
+        if record:
+            self.history.append(('removal', idx, customer))
+
+    def undo(self):
+        ''' Undo the last applied move '''
+
+        move, idx, arg = self.history.pop()
+
+        if move == 'reversal':
+            self.apply_reversal(idx, arg, record=False)
+        elif move == 'insertion':
+            self.apply_removal(idx, record=False)
+        else:
+            self.apply_insertion(idx, arg, record=False)
+
+    def best_reversed(self) -> bool:
+        ''' Apply the best improving reversal (returns False if none) '''
+
+        best, best_delta = None, 0
+
+        evaluated = checked = 0
+
+        for i in range(1, self.size):
+            for j in range(i + 1, self.size + 1):
+                evaluated += 1
+
+                delta = self.reversal_delta(i, j)
+
+                if delta < best_delta:
+                    checked += 1
+
+                    if self.reversal_feasible(i, j):
+                        best, best_delta = (i, j), delta
+
+        tracer.count('two_opt.moves', evaluated)
+        tracer.count('two_opt.checks', checked)
+
+        if best is None:
+            return False
+
+        self.apply_reversal(*best)
+
+        return True
+
+    def first_improvement(self, neighbors: np.ndarray) -> int:
+        ''' Apply improving reversals that join a customer to one of its neighbors until none is left (returns the moves applied) '''
+
+        value, d = self.value, self.distances
+
+        # Position of each customer in the route (-1 if not in the route)
+        position = np.full(len(self.demands), -1)
+        position[self.customers] = np.arange(1, self.size + 1)
+
+        # Customers whose don't-look bit is off
+        queue = deque(self.customers.tolist())
+        queued = np.zeros(len(self.demands), dtype=bool)
+        queued[self.customers] = True
+
+        moves = evaluated = 0
+
+        while queue:
+            c = queue.popleft()
+            queued[c] = False
+
+            p = position[c]
+
+            # No reversal can improve the route without removing an edge longer than the new one
+            limit = max(d[value[p - 1], c], d[c, value[p + 1]])
+
+            for n in neighbors[c]:
+                if d[c, n] >= limit:
+                    break
+
+                # The depot is at both ends of the route
+                if n == 0:
+                    targets = (0, self.size + 1)
+                elif position[n] >= 0:
+                    targets = (position[n],)
+                else:
+                    continue
+
+                found = None
+
+                for q in targets:
+                    if q > p:
+                        candidates = ((p + 1, q), (p, q - 1))
+                    else:
+                        candidates = ((q + 1, p), (q, p - 1))
+
+                    for i, j in candidates:
+                        if i < 1 or j > self.size or i >= j:
+                            continue
+
+                        evaluated += 1
+
+                        if self.reversal_delta(i, j) < 0 and self.reversal_feasible(i, j):
+                            found = i, j
+
+                            break
+
+                    if found is not None:
+                        break
+
+                if found is None:
+                    continue
+
+                i, j = found
+
+                self.apply_reversal(i, j, record=False)
+
+                position[value[i:j + 1]] = np.arange(i, j + 1)
+
+                moves += 1
+
+                # Look again at the customers around the changed edges
+                for customer in (value[i - 1], value[i], value[j], value[j + 1], c):
+                    if customer != 0 and not queued[customer]:
+                        queue.append(customer)
+                        queued[customer] = True
+
+                break
+
+        tracer.count('two_opt.moves', evaluated)
+
+        return moves
+
@@ -0,0 +1,338 @@
+import csv
+import json
+import numpy as np
+
+from os import path
+from glob import glob
+from time import perf_counter
+
+from src.data import Data
+from src.route import Route
+from src.k_means import KMeans
+from src.fleet_search import FleetSearch
+from src.two_opt import TwoOpt
+from src.local_search import LocalSearch
+from src.k_neighbors import KNeighbors
+from src.solver import Solver
+from src.lower_bound import LowerBound
+from src.validator import Validator
+from src.tracer import tracer
+from src.route_cache import RouteCache
+
+STAGES = ['load', 'fleet_search', 'k_means', 'two_opt', 'local_search', 'k_neighbors', 'load_model', 'solve']
+
+# Fields of each stage that are compared against a baseline (lower is better)
+METRICS = ['time', 'memory', 'cost']
+
+class Benchmark:
+    ''' Class for benchmarking the pipeline over a set of instances '''
+
+    def __init__(
+        self,
+        files: list[str],
+        k_neighbors: int,
+        vehicle_number: int | None = None,
+        random_state: int | None = 0,
+        use_solver: bool = True,
+        time_limit: int = 100,
+        trace_memory: bool = False,
+        best_known: str | None = None,
+        route_cache: int | None = None,
+        temporal_neighbors: bool = False,
+        solver_gap: float | None = None,
+        use_lima: bool | None = False,
+        memory_budget: int | None = None
+    ):
+        self.files = files # Instance files
+        self.k_neighbors = k_neighbors # Number of neighbors
+        self.vehicle_number = vehicle_number # Fixed number of vehicles (None to search from the minimum)
+        self.random_state = random_state # KMeans random state
+        self.use_solver = use_solver # Run the solver stages
+        self.time_limit = time_limit # Clasp time limit (seconds)
+        self.trace_memory = trace_memory # Record peak memory with tracemalloc (slows every stage)
+        self.route_cache = route_cache # Route evaluations cache capacity (None to disable)
+        self.temporal_neighbors = temporal_neighbors # Spatio-temporal neighbors without time infeasible arcs
+        self.solver_gap = solver_gap # Stop clasp within this gap of the lower bound (None to run it to the end)
+        self.use_lima = use_lima # Lima encoding (None to pick the smallest one within the memory budget)
+        self.memory_budget = memory_budget # Estimated memory allowed for the model (bytes, None for no limit)
+
+        self.best_known: dict[str, dict[str, float]] = {} # Best known costs by instance set
+
+        if best_known is not None:
+            with open(best_known, 'r') as file:
+                self.best_known = json.load(file)
+
+        self.results: list[dict] = [] # Results of each instance
+
+    @staticmethod
+    def instances(directory: str) -> list[str]:
+        ''' Get the instance files of a directory '''
+
+        return sorted(glob(path.join(directory, '*.txt')))
+
+    def measure(self, stage: str, func, *args, **kwargs) -> tuple[dict, object]:
+        ''' Measure the wall time and the peak memory of a stage function (tracemalloc is owned by the tracer) '''
+
+        with tracer.span(f'benchmark.{stage}') as span:
+            start = perf_counter()
+            result = func(*args, **kwargs)
+            end = perf_counter()
+
+        values = {'time': end - start}
+
+        if self.trace_memory:
+            values['memory'] = span.memory_peak
+
+        return values, result
+
+    @staticmethod
+    def euclidean_cost(data: Data, routes: list[Route]) -> float:
+        ''' Get the total cost of routes with unrounded Euclidean distances (the metric of the best known costs) '''
+
+        positions = np.array([customer.pos for customer in data.customers], dtype=float)
+
+        cost = 0.0
+
+        for route in routes:
+            value = [0] + [customer for customer in route.value if customer != 0] + [0]
+
+            cost += np.linalg.norm(np.diff(positions[value], axis=0), axis=1).sum()
+
+        return float(cost)
+
+    def gap(self, file: str, name: str, cost: float) -> float | None:
+        ''' Get the gap (%) between a Euclidean cost and the best known cost '''
+
+        best = self.best_known.get(path.basename(path.dirname(file)), {}).get(name)
+
+        if best is None:
+            return None
+
+        return 100 * (cost - best) / best
+
+    def run_instance(self, file: str) -> dict:
+        ''' Run every stage of the pipeline on an instance '''
+
+        stages: dict[str, dict] = {}
+
+        stages['load'], data = self.measure('load', Data(file).load)
+
+        if self.route_cache is not None:
+            data.route_cache = RouteCache(self.route_cache)
+
+        if self.vehicle_number is None:
+            # The smallest number of vehicles with feasible routes (KMeans repaired by the local search)
+            stages['fleet_search'], (_, vehicle_number, routes) = self.measure(
+                'fleet_search',
+                FleetSearch(data, random_state=self.random_state).run
+            )
+            stages['fleet_search']['cost'] = float(sum(route.cost for route in routes))
+        else:
+            vehicle_number = self.vehicle_number
+
+            stages['k_means'], (_, routes) = self.measure(
+                'k_means',
+                KMeans(data, vehicle_number, random_state=self.random_state).run
+            )
+            stages['k_means']['cost'] = float(sum(route.cost for route in routes))
+
+        stages['two_opt'], (_, routes) = self.measure('two_opt', TwoOpt(routes).run)
+        stages['two_opt']['cost'] = float(sum(route.cost for route in routes))
+
+        stages['local_search'], (_, routes) = self.measure('local_search', LocalSearch(data, routes).run)
+        stages['local_search']['cost'] = float(sum(route.cost for route in routes))
+
+        k_neighbors = KNeighbors(data, self.k_neighbors, routes, temporal=self.temporal_neighbors)
+
+        stages['k_neighbors'], (_, matrices) = self.measure('k_neighbors', k_neighbors.run)
+        # Allowed arcs (zero distances included, the diagonal excluded)
+        stages['k_neighbors']['arcs'] = int(sum((matrix != -1).sum() - len(matrix) for matrix in matrices))
+
+        if self.use_solver:
+            lower_bound = None
+
+            if self.solver_gap is not None:
+                # The spatio-temporal MST is not built on the distances
+                mst = None if self.temporal_neighbors else k_neighbors.mst
+
+                _, lower_bound = LowerBound(data, len(matrices), matrices, mst).run()
+
+            solver = Solver(
+                data, 
+                matrices, 
+                use_lima=self.use_lima,
+                time_limit=self.time_limit, 
+                gap=self.solver_gap, 
+                lower_bound=lower_bound,
+                memory_budget=self.memory_budget
+            )
+
+            stages['load_model'], _ = self.measure('load_model', solver.load_model)
+            stages['load_model']['variables'] = solver.counter - 1
+            stages['load_model']['constraints'] = len(solver.constraints)
+            stages['load_model']['bytes'] = sum(len(c) + 1 for c in solver.constraints)
+            stages['load_model']['encoding'] = ['mtz', 'lima'][solver.use_lima]
+            stages['load_model']['downgraded'] = solver.downgraded
+
+            stages['solve'], routes = self.measure('solve', solver.solve)
+            stages['solve']['cost'] = float(sum(route.cost for route in routes))
+            stages['solve']['clasp_memory'] = solver.clasp_memory
+
+            if lower_bound is not None:
+                stages['solve']['lower_bound'] = float(lower_bound)
+
+        cost = stages['solve' if self.use_solver else 'local_search']['cost']
+
+        # The pipeline works on rounded distances, the best known costs on real ones
+        euclidean_cost = self.euclidean_cost(data, routes)
+
+        # Independent check of the final routes (coverage, capacity and time windows)
+        _, report = Validator(data).run(*Validator.flatten(routes))
+
+        valid = bool(report['valid'][0])
+
+        result = {
+            'instance': path.relpath(file),
+            'name': data.name,
+            'customers': len(data.customers) - 1,
+            'vehicles': vehicle_number,
+            'cost': cost,
+            'euclidean_cost': euclidean_cost,
+            'gap': self.gap(file, data.name, euclidean_cost) if valid else None,
+            'valid': valid,
+            'stages': stages,
+        }
+
+        if data.route_cache is not None:
+            result['route_cache'] = data.route_cache.stats()
+
+        return result
+
+    def run(self, verbose: bool = True) -> list[dict]:
+        ''' Run the benchmark on every instance '''
+
+        self.results = []
+
+        # The stage peaks are measured by the tracer spans
+        if self.trace_memory and not tracer.trace_memory:
+            tracer.enable(trace_memory=True)
+
+        for file in self.files:
+            counters = dict(tracer.counters)
+            
+            try:
+                with tracer.span('benchmark.instance', file=file):
+                    result = self.run_instance(file)
+            except Exception as e:
+                result = {'instance': path.relpath(file), 'error': str(e)}
+
+            if tracer.enabled:
+                result['counters'] = {
+                    name: value - counters.get(name, 0) for name, value in tracer.counters.items()
+                }
+
+            if verbose:
+                if 'error' in result:
+                    print(f'{result["instance"]}: {result["error"]}')
+                else:
+                    gap = '-' if result['gap'] is None else f'{result["gap"]:.2f}%'
+                    time = sum(stage['time'] for stage in result['stages'].values())
+
+                    invalid = '' if result['valid'] else ' INVALID'
+
+                    print(f'{result["instance"]}: cost {result["cost"]} (gap {gap}) in {time:.2f}s{invalid}')
+
+            self.results.append(result)
+
+        return self.results
+
+    def rows(self) -> list[dict]:
+        ''' Flatten the results into rows (one per instance) '''
+
+        rows: list[dict] = []
+
+        for result in self.results:
+            row = {key: value for key, value in result.items() if not isinstance(value, dict)}
+
+            for stage, values in result.get('stages', {}).items():
+                for key, value in values.items():
+                    row[f'{stage}_{key}'] = value
+
+            for name, value in result.get('counters', {}).items():
+                row[name] = value
+
+            for name, value in result.get('route_cache', {}).items():
+                row[f'route_cache_{name}'] = value
+
+            rows.append(row)
+
+        return rows
+
+    def save(self, file: str):
+        ''' Save the results to a JSON or CSV file (by extension) '''
+
+        if file.endswith('.csv'):
+            rows = self.rows()
+
+            fields: list[str] = []
+            for row in rows:
+                fields += [field for field in row if field not in fields]
+
+            with open(file, 'w', newline='') as output:
+                writer = csv.DictWriter(output, fieldnames=fields)
+                writer.writeheader()
+                writer.writerows(rows)
+        else:
+            with open(file, 'w') as output:
+                json.dump({'trace_memory': self.trace_memory, 'results': self.results}, output, indent=4)
+
+    def compare(
+        self, 
+        file: str, 
+        tolerance: float = 0.2, 
+        cost_tolerance: float = 0.0,
+        min_time: float = 0.05
+    ) -> list[str]:
+        ''' Compare the results with a JSON baseline and return the regressions found '''
+
+        with open(file, 'r') as baseline_file:
+            baseline = json.load(baseline_file)
+
+        if baseline.get('trace_memory') != self.trace_memory:
+            print('Warning: baseline and current run differ on memory tracing, times are not comparable')
+
+        previous = {result['instance']: result for result in baseline['results']}
+
+        regressions: list[str] = []
+
+        for result in self.results:
+            old = previous.get(result['instance'])
+
+            if old is None or 'error' in old:
+                continue
+
+            if 'error' in result:
+                regressions.append(f'{result["instance"]}: failed ({result["error"]})')
+
+                continue
+
+            for stage in STAGES:
+                new_values = result['stages'].get(stage, {})
+                old_values = old['stages'].get(stage, {})
+
+                for metric in METRICS:
+                    if metric not in new_values or metric not in old_values:
+                        continue
+
+                    new, old_value = new_values[metric], old_values[metric]
+
+                    # Ignore noise on stages that are too fast to be measured reliably
+                    if metric == 'time' and max(new, old_value) < min_time:
+                        continue
+
+                    limit = cost_tolerance if metric == 'cost' else tolerance
+
+                    if new > old_value * (1 + limit):
+                        regressions.append(f'{result["instance"]}: {stage} {metric} {old_value:.4g} -> {new:.4g}')
+
+        return regressions
@@ -0,0 +1,140 @@
+import json
+import numpy as np
+
+from os import makedirs, path, replace
+from hashlib import sha256
+from typing import Callable
+
+from src.data import Data
+from src.route import Route
+
+# Salt of every key (bump when the instance loading changes: 2 for the Data.load fix)
+VERSION = 2
+
+# Salt of each stage (bump a stage when its output changes for the same input and parameters)
+STAGE_VERSIONS: dict[str, int] = {
+    'fleet_search': 2, # Local search repair keeps feasible routes feasible
+    'local_search': 2, # Feasible routes stay feasible
+}
+
+class Checkpoint:
+    ''' Class for storing the output of each stage on disk '''
+
+    def __init__(self, directory: str = '.checkpoints'):
+        self.directory = directory # Checkpoints directory
+
+    @staticmethod
+    def instance_key(file: str) -> str:
+        ''' Get the key of an instance file (hash of its content) '''
+
+        with open(file, 'rb') as instance:
+            return sha256(instance.read()).hexdigest()
+
+    @staticmethod
+    def key(parent: str, stage: str, **params) -> str:
+        ''' Get the key of a stage from the key of its input, its parameters and the version salts '''
+
+        content = json.dumps({
+            'version': VERSION,
+            'stage_version': STAGE_VERSIONS.get(stage, 1),
+            'parent': parent,
+            'stage': stage,
+            'params': params
+        }, sort_keys=True)
+
+        return sha256(content.encode()).hexdigest()
+
+    def path(self, key: str) -> str:
+        ''' Get the file of a key '''
+
+        return path.join(self.directory, f'{key}.npz')
+
+    def save(self, key: str, **arrays: np.ndarray):
+        ''' Save arrays under a key (atomically) '''
+
+        makedirs(self.directory, exist_ok=True)
+
+        temp = f'{self.path(key)}.tmp'
+
+        with open(temp, 'wb') as file:
+            np.savez_compressed(file, **arrays)
+
+        replace(temp, self.path(key))
+
+    def load(self, key: str) -> dict[str, np.ndarray] | None:
+        ''' Load the arrays saved under a key '''
+
+        if not path.exists(self.path(key)):
+            return None
+
+        with np.load(self.path(key)) as arrays:
+            return dict(arrays)
+
+    def save_routes(self, key: str, routes: list[Route]):
+        ''' Save routes as a flat customer id array with offsets '''
+
+        values = np.array([c for route in routes for c in route.value], dtype=np.int32)
+        offsets = np.cumsum([0] + [len(route) for route in routes], dtype=np.int32)
+
+        self.save(key, values=values, offsets=offsets)
+
+    def load_routes(self, data: Data, key: str) -> list[Route] | None:
+        ''' Load the routes saved under a key '''
+
+        arrays = self.load(key)
+
+        if arrays is None:
+            return None
+
+        values, offsets = arrays['values'].tolist(), arrays['offsets'].tolist()
+
+        return [Route(data, values[start:end]) for start, end in zip(offsets, offsets[1:])]
+
+    def save_matrices(self, key: str, matrices: list[np.ndarray]):
+        ''' Save the neighbor matrices as their allowed arcs (vehicle, i, j) and weights '''
+
+        stacked = np.stack(matrices)
+
+        arcs = np.argwhere(stacked != -1).astype(np.int32)
+        weights = stacked[stacked != -1]
+
+        self.save(key, arcs=arcs, weights=weights, shape=np.array(stacked.shape))
+
+    def load_matrices(self, key: str) -> list[np.ndarray] | None:
+        ''' Load the neighbor matrices saved under a key '''
+
+        arrays = self.load(key)
+
+        if arrays is None:
+            return None
+
+        stacked = np.full(arrays['shape'], -1, dtype=int)
+
+        v, i, j = arrays['arcs'].T
+        stacked[v, i, j] = arrays['weights']
+
+        return list(stacked)
+
+    def routes(self, data: Data, key: str, compute: Callable[[], list[Route]]) -> list[Route]:
+        ''' Load the routes of a key or compute and save them '''
+
+        routes = self.load_routes(data, key)
+
+        if routes is None:
+            routes = compute()
+
+            self.save_routes(key, routes)
+
+        return routes
+
+    def matrices(self, key: str, compute: Callable[[], list[np.ndarray]]) -> list[np.ndarray]:
+        ''' Load the neighbor matrices of a key or compute and save them '''
+
+        matrices = self.load_matrices(key)
+
+        if matrices is None:
+            matrices = compute()
+
+            self.save_matrices(key, matrices)
+
+        return matrices
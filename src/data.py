@@ -2,6 +2,7 @@ import numpy as np
 from math import ceil
 
 from src.customer import Customer
+from src.route_cache import RouteCache
 from src.utils import distance
 
 class Data:
@@ -20,6 +21,13 @@ class Data:
         self.min_vehicle_number = 0 # Minimum number of vehicles
         
         self.distances: np.ndarray = None # Distance matrix
+        
+        self.demands: np.ndarray = None # Demand of each customer
+        self.ready_times: np.ndarray = None # Ready time of each customer
+        self.due_dates: np.ndarray = None # Due date of each customer
+        self.service_times: np.ndarray = None # Service time of each customer
+        
+        self.route_cache: RouteCache | None = None # Route evaluations cache (None to disable)
     
     def load(self):
         ''' Load an instance from the file '''
@@ -30,12 +38,55 @@ class Data:
         self.name = lines[0].strip()
         self.max_vehicle_number, self.vehicle_capacity = map(int, lines[4].strip().split())
             
-        for line in lines[9:-1]:
-            self.customers.append(Customer(*map(int, line.strip().split())))
+        for line in lines[9:]:
+            # Some files end with one or more blank lines, others right after the last customer
+            if line.strip():
+                self.customers.append(Customer(*map(int, line.strip().split())))
+        
+        return self.setup()
+    
+    @staticmethod
+    def from_rows(
+        name: str, 
+        max_vehicle_number: int, 
+        vehicle_capacity: int, 
+        rows: np.ndarray,
+        distances: np.ndarray | None = None
+    ) -> 'Data':
+        ''' Create an instance from customer rows (id, x, y, demand, ready time, due date, service time) '''
+        
+        data = Data('')
+        
+        data.name = name
+        data.max_vehicle_number = max_vehicle_number
+        data.vehicle_capacity = vehicle_capacity
+        data.customers = [Customer(*map(int, row)) for row in rows]
+        
+        return data.setup(distances)
+    
+    def rows(self) -> np.ndarray:
+        ''' Get the customer rows (id, x, y, demand, ready time, due date, service time) '''
+        
+        return np.array([
+            [c.id, c.x, c.y, c.demand, c.ready_time, c.due_date, c.service_time] for c in self.customers
+        ])
+    
+    def setup(self, distances: np.ndarray | None = None):
+        ''' Compute the depot, the customer arrays and the distance matrix (unless given) '''
         
         self.depot = self.customers[0]
         
         self.min_vehicle_number = ceil(sum(c.demand for c in self.customers) / self.vehicle_capacity)
+        
+        self.demands = np.array([c.demand for c in self.customers])
+        self.ready_times = np.array([c.ready_time for c in self.customers])
+        self.due_dates = np.array([c.due_date for c in self.customers])
+        self.service_times = np.array([c.service_time for c in self.customers])
+        
+        if distances is not None:
+            self.distances = distances
+            
+            return self
             
         self.distances = np.zeros((len(self.customers), len(self.customers)), dtype=int)
             
@@ -43,4 +94,14 @@ class Data:
             for j, j_customer in enumerate(self.customers[i + 1:], start=i + 1):
                 self.distances[i, j] = self.distances[j, i] = round(distance(i_customer.pos, j_customer.pos))
         
-        return self
\ No newline at end of file
+        return self
+    
+    def neighbors(self, k: int) -> np.ndarray:
+        ''' Get the k nearest customers (depot included) of each customer, sorted by distance '''
+        
+        order = np.argsort(self.distances, axis=1, kind='stable')
+        
+        # Drop each customer from its own list (not always first with repeated positions)
+        order = order[order != np.arange(len(self.customers))[:, None]].reshape(len(self.customers), -1)
+        
+        return order[:, :k]
@@ -0,0 +1,107 @@
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor
+
+from src.data import Data
+from src.route import Route
+from src.k_means import KMeans
+from src.local_search import LocalSearch
+from src.utils import timer
+
+class FleetSearch:
+    ''' Class for searching the smallest number of vehicles with feasible routes '''
+
+    def __init__(
+        self,
+        data: Data,
+        n_jobs: int | None = None,
+        random_state: int | None = 0,
+        repair: bool = True
+    ):
+        self.data = data # CVRPTW instance
+        self.n_jobs = n_jobs # Number of vehicle counts repaired at once (None for one at a time, faster on the Solomon instances)
+        self.random_state = random_state # KMeans random state
+        self.repair = repair # Repair the KMeans routes with the local search before checking them
+
+        self.tried: dict[int, bool] = {} # Feasibility of each vehicle count evaluated
+
+    @timer
+    def run(self) -> tuple[float, int, list[Route]]:
+        ''' Run the search from the minimum number of vehicles (returns it with its routes) '''
+
+        batch = max(self.n_jobs or 1, 1)
+
+        centroids: list[np.ndarray] | None = None
+
+        executor = None
+        if batch > 1:
+            executor = ProcessPoolExecutor(batch, initializer=init_worker, initargs=(self.data,))
+
+        try:
+            for start in range(self.data.min_vehicle_number, self.data.max_vehicle_number + 1, batch):
+                counts = range(start, min(start + batch, self.data.max_vehicle_number + 1))
+
+                tasks = []
+
+                # KMeans runs in order, each count from the centroids of the previous one (the same for any n_jobs)
+                for count in counts:
+                    k_means = KMeans(self.data, count, random_state=self.random_state, centroids=centroids)
+
+                    try:
+                        _, routes = k_means.run()
+
+                        values = [route.value for route in routes]
+                    except ValueError:
+                        values = None
+
+                    centroids = k_means.centroids
+
+                    tasks.append((count, values, self.repair))
+
+                # Only the repairs and feasibility checks run at once
+                if executor is None:
+                    worker['data'] = self.data
+
+                    results = [repair_worker(task) for task in tasks]
+                else:
+                    results = list(executor.map(repair_worker, tasks))
+
+                for count, values in results:
+                    self.tried[count] = values is not None
+
+                for count, values in results:
+                    if values is not None:
+                        return count, [Route(self.data, value) for value in values]
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        raise ValueError('Cannot find a feasible number of vehicles')
+
+# Worker process state (set once by init_worker)
+worker: dict = {}
+
+def init_worker(data: Data):
+    ''' Keep the instance in a worker process (sent once per worker) '''
+
+    worker['data'] = data
+
+def repair_worker(task: tuple) -> tuple[int, list[list[int]] | None]:
+    ''' Repair the KMeans routes of a number of vehicles (returns them if feasible) '''
+
+    count, values, repair = task
+
+    if values is None:
+        return count, None
+
+    data: Data = worker['data']
+
+    routes = [Route(data, value) for value in values]
+
+    if repair:
+        _, routes = LocalSearch(data, routes).run()
+
+    if not all(route.feasible for route in routes):
+        return count, None
+
+    return count, [route.value for route in routes]
@@ -7,6 +7,7 @@ from src.customer import Customer
 from src.route import Route
 
 from src.utils import timer, distance
+from src.tracer import tracer
 
 class KMeans:
     def __init__(
@@ -14,11 +15,14 @@ class KMeans:
         data: Data,
         n_clusters: int,
         max_iter = 100, 
-        random_state: int | None = None
+        random_state: int | None = None,
+        centroids: list[np.ndarray] | None = None
     ):
         self.data = data
         self.n_clusters = n_clusters
         self.max_iter = max_iter
+        
+        self.centroids = centroids # Initial centroids (warm start), then the last ones used
 
         if random_state is not None:
             seed(random_state)
@@ -32,13 +36,21 @@ class KMeans:
         clusters: list[Route] = []
         pos: list[np.ndarray] = []
         
-        for customer in sample(customers, self.n_clusters):
-            clusters.append(Route(self.data, [], customer.pos))
-            pos.append(customer.pos)
+        # Keep the given centroids and start the remaining ones at random customers
+        initial = list(self.centroids or [])[:self.n_clusters]
+        initial += [customer.pos for customer in sample(customers, self.n_clusters - len(initial))]
+        
+        for centroid in initial:
+            clusters.append(Route(self.data, [], centroid))
+            pos.append(centroid)
+        
+        self.centroids = pos
         
         for it in range(self.max_iter):
             # print(f'Iteration {it + 1}/{self.max_iter}')
             
+            tracer.count('k_means.iterations')
+            
             for i, cluster in enumerate(clusters):
                 cluster.clear(pos[i])
 
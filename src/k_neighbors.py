@@ -9,12 +9,53 @@ from src.utils import timer
 class KNeighbors:
     ''' Class for the k-nearest neighbors heuristic '''
     
-    def __init__(self, data: Data, k: int, routes: list[Route]):  
+    def __init__(
+        self, 
+        data: Data, 
+        k: int, 
+        routes: list[Route], 
+        temporal: bool = False, 
+        waiting_weight: float = 1.0
+    ):  
         self.data = data # CVRPTW instance
         self.k = k # Number of neighbors
         self.routes = routes # Routes list
+        self.temporal = temporal # Rank by distance plus waiting time and drop time infeasible arcs
+        self.waiting_weight = waiting_weight # Weight of the waiting time in the spatio-temporal metric
         
         self.mst: Graph = None # Minimum spanning tree
+        self.weights: np.ndarray = None # Metric between each pair of customers (inf if incompatible)
+        self.allowed: np.ndarray = None # Time feasible arcs (i, j)
+        
+    def load_weights(self):
+        ''' Load the metric between each pair of customers and the time feasible arcs '''
+        
+        distances = self.data.distances
+        
+        self.allowed = np.ones(distances.shape, dtype=bool)
+        
+        if not self.temporal:
+            self.weights = distances
+            
+            return
+        
+        ready_times = self.data.ready_times
+        due_dates = self.data.due_dates
+        
+        # Arrival window at j leaving i between its ready time and its due date
+        earliest = (ready_times + self.data.service_times)[:, None] + distances
+        latest = (due_dates + self.data.service_times)[:, None] + distances
+        
+        self.allowed = earliest <= due_dates[None, :]
+        np.fill_diagonal(self.allowed, False)
+        
+        # Waiting time at j even leaving i as late as possible
+        waiting = np.maximum(ready_times[None, :] - latest, 0)
+        
+        weights = np.where(self.allowed, distances + self.waiting_weight * waiting, np.inf)
+        
+        # Pairs are ranked by their best direction
+        self.weights = np.minimum(weights, weights.T)
         
     def load_mst(self):
         ''' Load the minimum spanning tree '''  
@@ -22,13 +63,19 @@ class KNeighbors:
         graph = Graph()
         for i in range(len(self.data.customers)):
             for j in range(len(self.data.customers)):
-                graph.add_edge(i, j, weight=self.data.distances[i, j])
+                if np.isinf(self.weights[i, j]):
+                    continue
+                
+                graph.add_edge(i, j, weight=self.weights[i, j])
     
         self.mst = minimum_spanning_tree(graph)
         
     def nearest_neighbors_mst(self, customer: int) -> list[int]:
         ''' Get the nearest neighbors from the minimum spanning tree '''
     
+        if customer not in self.mst:
+            return []
+        
         neighbors = list(self.mst.neighbors(customer))
         weights = [self.mst.get_edge_data(customer, i)['weight'] for i in neighbors]
         
@@ -40,9 +87,12 @@ class KNeighbors:
         ''' Get the nearest neighbors from the distance matrix '''
         
         neighbors = list(range(len(self.data.customers)))
-        weights = list(self.data.distances[customer])
+        weights = list(self.weights[customer])
         
-        sorted_neighbors = [item for _, item in sorted(zip(weights, neighbors)) if item != customer]
+        sorted_neighbors = [
+            item for weight, item in sorted(zip(weights, neighbors)) 
+            if item != customer and not np.isinf(weight)
+        ]
         
         return sorted_neighbors[:self.k]
         
@@ -59,7 +109,8 @@ class KNeighbors:
                 if len(neighbors) == self.k:
                     break
         
-        if len(neighbors) < self.k:
+        # Customers may have less than k time compatible neighbors
+        if len(neighbors) < self.k and not self.temporal:
             raise Exception('Cannot find all neighbors')
         
         return neighbors
@@ -68,6 +119,7 @@ class KNeighbors:
     def run(self) -> tuple[float, list[np.ndarray]]:
         ''' Run the k-nearest neighbors heuristic '''
         
+        self.load_weights()
         self.load_mst()
         
         matrices: list[np.ndarray] = []
@@ -89,7 +141,12 @@ class KNeighbors:
             for customer in route:
                 for neighbor in self.nearest_neighbors(customer.id):
                     distance = round(self.data.distances[customer.id, neighbor])
-                    matrix[customer.id, neighbor] = matrix[neighbor, customer.id] = distance
+                    
+                    if self.allowed[customer.id, neighbor]:
+                        matrix[customer.id, neighbor] = distance
+                        
+                    if self.allowed[neighbor, customer.id]:
+                        matrix[neighbor, customer.id] = distance
             
             matrices.append(matrix)
             
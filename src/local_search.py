@@ -0,0 +1,178 @@
+import numpy as np
+
+from src.data import Data
+from src.route import Route
+from src.segment import Segment, RouteSegments
+from src.tracer import tracer
+from src.utils import timer
+
+class LocalSearch:
+    ''' Class for the inter-route local search (relocate, swap, 2-opt* and or-opt) '''
+
+    def __init__(self, data: Data, routes: list[Route], k: int = 10, max_chain: int = 3):
+        self.data = data # CVRPTW instance
+        self.routes = routes # Routes list
+        self.k = k # Number of neighbors of each customer (granular neighborhood)
+        self.max_chain = max_chain # Longest chain moved by or-opt
+
+        self.segments: list[RouteSegments] = [] # Segments of each route
+        self.route_of: np.ndarray = None # Route index of each customer
+        self.position_of: np.ndarray = None # Position of each customer (depot first)
+
+    def load(self, r: int):
+        ''' Rebuild the segments and positions of a route '''
+
+        segments = self.segments[r]
+
+        for p, customer in enumerate(segments.value[1:-1], start=1):
+            self.route_of[customer] = r
+            self.position_of[customer] = p
+
+    def replace(self, r: int, value: list[int]):
+        ''' Replace the customers of a route '''
+
+        self.segments[r] = RouteSegments(self.data, value)
+
+        self.load(r)
+
+    def violation(self, segment: Segment):
+        ''' Get the time window and capacity violation of a route segment '''
+
+        return segment.warp + max(segment.load - self.data.vehicle_capacity, 0)
+
+    def accept(self, r1: int, new1: Segment, r2: int, new2: Segment) -> bool:
+        ''' Check if replacing two routes by the new segments improves them (violation first, then distance) '''
+
+        old1, old2 = self.segments[r1].route, self.segments[r2].route
+
+        old_violations = self.violation(old1), self.violation(old2)
+        new_violations = self.violation(new1), self.violation(new2)
+
+        # A feasible route never becomes infeasible (even if the other route improves more)
+        if any(old == 0 and new > 0 for old, new in zip(old_violations, new_violations)):
+            return False
+
+        if sum(new_violations) != sum(old_violations):
+            return sum(new_violations) < sum(old_violations)
+
+        return new1.distance + new2.distance < old1.distance + old2.distance
+
+    def moves(self, u: int, v: int):
+        ''' Get the moves (new customers of both routes as pieces) joining u and v, with the routes they apply to '''
+
+        r1, r2 = self.route_of[u], self.route_of[v]
+
+        s1, s2 = self.segments[r1], self.segments[r2]
+        p, q = self.position_of[u], self.position_of[v]
+
+        n1, n2 = len(s1) - 2, len(s2) - 2
+
+        u_segment = s1.customers[p]
+        v_segment = s2.customers[q]
+
+        # Relocate u after or before v (never empty a route)
+        if n1 > 1:
+            yield 'relocate', r1, [s1.prefix[p - 1], s1.suffix[p + 1]], r2, [s2.prefix[q], u_segment, s2.suffix[q + 1]]
+            yield 'relocate', r1, [s1.prefix[p - 1], s1.suffix[p + 1]], r2, [s2.prefix[q - 1], u_segment, s2.suffix[q]]
+
+        # Swap u and v
+        yield 'swap', r1, [s1.prefix[p - 1], v_segment, s1.suffix[p + 1]], r2, [s2.prefix[q - 1], u_segment, s2.suffix[q + 1]]
+
+        # 2-opt*: u continues with v and the rest of its route, v's predecessor continues with u's successor
+        if q > 1 or p < n1:
+            yield '2-opt*', r1, [s1.prefix[p], s2.suffix[q]], r2, [s2.prefix[q - 1], s1.suffix[p + 1]]
+
+        # Or-opt: move the chain starting at u after v (grown by one customer for each length)
+        chain = u_segment
+
+        for length in range(2, self.max_chain + 1):
+            if p + length - 1 > n1 or n1 - length < 1:
+                break
+
+            chain = chain.concat(s1.customers[p + length - 1], self.data.distances)
+
+            yield 'or-opt', r1, [s1.prefix[p - 1], s1.suffix[p + length]], r2, [s2.prefix[q], chain, s2.suffix[q + 1]]
+
+    def apply(self, r1: int, pieces1: list[Segment], r2: int, pieces2: list[Segment]):
+        ''' Apply a move given by the pieces of both routes '''
+
+        values: list[list[int]] = []
+
+        for r, pieces in ((r1, pieces1), (r2, pieces2)):
+            value: list[int] = []
+
+            for piece in pieces:
+                value += self.expand(piece)
+
+            values.append([c for c in value if c != 0])
+
+        self.replace(r1, values[0])
+        self.replace(r2, values[1])
+
+    def expand(self, piece: Segment) -> list[int]:
+        ''' Get the customers of a piece (a prefix, suffix, chain or single customer of a current route) '''
+
+        first, last = piece.first, piece.last
+
+        # Pieces that start or end at the depot are prefixes or suffixes of the route of their other end
+        customer = last if first == 0 else first
+
+        if customer == 0:
+            return []
+
+        segments = self.segments[self.route_of[customer]]
+        value = segments.value
+
+        if first == 0:
+            return value[:self.position_of[last] + 1]
+
+        if last == 0:
+            return value[self.position_of[first]:]
+
+        return value[self.position_of[first]:self.position_of[last] + 1]
+
+    @timer
+    def run(self) -> tuple[float, list[Route]]:
+        ''' Run the local search until no move improves the routes '''
+
+        self.segments = [RouteSegments(self.data, route.value) for route in self.routes]
+
+        self.route_of = np.full(len(self.data.customers), -1)
+        self.position_of = np.zeros(len(self.data.customers), dtype=int)
+
+        for r in range(len(self.segments)):
+            self.load(r)
+
+        neighbors = self.data.neighbors(self.k)
+        distances = self.data.distances
+
+        evaluated = 0
+
+        improved = True
+
+        while improved:
+            improved = False
+
+            for u in range(1, len(self.data.customers)):
+                for v in neighbors[u]:
+                    if v == 0 or self.route_of[u] == self.route_of[v]:
+                        continue
+
+                    for name, r1, pieces1, r2, pieces2 in self.moves(u, v):
+                        evaluated += 1
+
+                        new1 = Segment.merge(distances, *pieces1)
+                        new2 = Segment.merge(distances, *pieces2)
+
+                        if self.accept(r1, new1, r2, new2):
+                            self.apply(r1, pieces1, r2, pieces2)
+
+                            tracer.count(f'local_search.{name}')
+
+                            improved = True
+
+                            break
+
+        tracer.count('local_search.moves', evaluated)
+
+        return [Route(self.data, segments.value[1:-1]) for segments in self.segments]
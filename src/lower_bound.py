@@ -0,0 +1,103 @@
+import numpy as np
+
+from networkx import Graph
+
+from src.data import Data
+from src.utils import timer
+from src.tracer import tracer
+
+class LowerBound:
+    ''' Class for a lower bound of the total distance with a fixed number of vehicles (all of them used) '''
+
+    def __init__(
+        self,
+        data: Data,
+        vehicle_number: int,
+        matrices: list[np.ndarray] | None = None,
+        mst: Graph | None = None
+    ):
+        self.data = data # CVRPTW instance
+        self.vehicle_number = vehicle_number # Number of vehicles
+        self.matrices = matrices # Allowed arcs of each vehicle (None for all arcs)
+        self.mst = mst # Minimum spanning tree of the distances (computed if None)
+
+    def mst_weight(self) -> float:
+        ''' Get the weight of the minimum spanning tree of the distances (Prim) '''
+
+        if self.mst is not None:
+            return self.mst.size(weight='weight')
+
+        distances = self.data.distances
+
+        in_tree = np.zeros(len(distances), dtype=bool)
+        in_tree[0] = True
+
+        best = distances[0].astype(float)
+        best[0] = np.inf
+
+        weight = 0
+
+        for _ in range(len(distances) - 1):
+            i = int(np.argmin(best))
+
+            weight += best[i]
+
+            in_tree[i] = True
+            best = np.minimum(best, distances[i])
+            best[in_tree] = np.inf
+
+        return weight
+
+    def tree_bound(self) -> float:
+        ''' Get the spanning tree bound (removing the last arc of each route leaves a spanning tree) '''
+
+        depot = np.sort(self.data.distances[0, 1:])
+
+        return self.mst_weight() + depot[:self.vehicle_number].sum()
+
+    def degree_bound(self) -> float:
+        ''' Get the degree bound (one arc leaves and enters each customer, and one per vehicle at the depot) '''
+
+        distances = self.data.distances.astype(float)
+
+        allowed = np.ones(distances.shape, dtype=bool)
+
+        if self.matrices is not None:
+            allowed = np.any([matrix != -1 for matrix in self.matrices], axis=0)
+
+        # Arcs between customers that always miss the due date of the second one
+        earliest = (self.data.ready_times + self.data.service_times)[:, None] + self.data.distances
+        late = earliest > self.data.due_dates[None, :]
+        late[0, :] = late[:, 0] = False
+
+        np.fill_diagonal(allowed, False)
+
+        weights = np.where(allowed & ~late, distances, np.inf)
+
+        bounds: list[float] = []
+
+        # Arcs leaving each node, then arcs entering each node
+        for weights in (weights, weights.T):
+            depot = np.sort(weights[0, 1:])[:self.vehicle_number]
+            customers = weights[1:].min(axis=1)
+
+            bounds.append(depot.sum() + customers.sum())
+
+        if np.isinf(bounds).any():
+            raise ValueError('Cannot find feasible arcs for all customers')
+
+        return max(bounds)
+
+    @timer
+    def run(self) -> tuple[float, float]:
+        ''' Run the lower bound (the best of the spanning tree and degree bounds) '''
+
+        bound = self.tree_bound()
+
+        # The degree bound is skipped when the allowed arcs leave a customer without a feasible neighbor
+        try:
+            bound = max(bound, self.degree_bound())
+        except ValueError:
+            tracer.count('lower_bound.degree_skipped')
+
+        return bound
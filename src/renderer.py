@@ -0,0 +1,72 @@
+import numpy as np
+
+from os import path, makedirs
+from multiprocessing import Process, Queue
+
+from src.data import Data
+from src.route import Route
+from src.utils import render
+
+class Renderer:
+    ''' Class for rendering route plots to files in a background process (use it as a context manager) '''
+
+    def __init__(self, directory: str = 'plots', extension: str = 'png', enabled: bool = True):
+        self.directory = directory # Output directory
+        self.extension = extension # Image format (png or svg)
+        self.enabled = enabled # Render the plots (nothing is started if disabled)
+
+        self.queue: Queue | None = None # Plots waiting to be rendered
+        self.process: Process | None = None # Rendering process
+
+    def start(self):
+        ''' Start the rendering process '''
+
+        if self.enabled:
+            makedirs(self.directory, exist_ok=True)
+
+            self.queue = Queue()
+
+            self.process = Process(target=render_worker, args=(self.queue,), daemon=True)
+            self.process.start()
+
+    def close(self):
+        ''' Wait for the plots already submitted and stop the rendering process '''
+
+        if self.enabled:
+            self.queue.put(None)
+
+            self.process.join()
+
+    def __enter__(self):
+        self.start()
+
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+        return False
+
+    def submit(self, data: Data, routes: list[Route], name: str) -> str | None:
+        ''' Queue the plot of the routes (returns its file, None if disabled) '''
+
+        if not self.enabled:
+            return None
+
+        file = path.join(self.directory, f'{data.name}_{name}.{self.extension}')
+
+        # Only arrays are sent to the rendering process
+        positions = np.array([customer.pos for customer in data.customers])
+        values = [[customer for customer in route.value if customer != 0] for route in routes]
+
+        title = f'{data.name} (Cost: {sum(route.cost for route in routes):.2f})'
+
+        self.queue.put((positions, values, data.demands, title, file))
+
+        return file
+
+def render_worker(queue: Queue):
+    ''' Render the queued plots until None is received '''
+
+    while (item := queue.get()) is not None:
+        render(*item)
@@ -2,6 +2,8 @@ import numpy as np
 
 from src.data import Data
 from src.customer import Customer
+from src.tracer import tracer
+from src.segment import RouteSegments
 
 class Route:
     ''' Class for the route '''
@@ -24,6 +26,8 @@ class Route:
         self._demand = demand # Route demand
         self._time = time # Route time (for clustering)
         
+        self._segments: RouteSegments | None = None # Prefix and suffix segments
+        
     def __repr__(self):
         ''' Return the string representation of the route '''
         
@@ -54,6 +58,8 @@ class Route:
         
         self.value.append(customer.id)
         
+        self._segments = None
+        
         if self._demand >= 0:
             self._demand += customer.demand
             
@@ -84,6 +90,8 @@ class Route:
         
         self.value.clear()
         
+        self._segments = None
+        
         self.pos = pos
         
         self._cost = 0
@@ -121,16 +129,51 @@ class Route:
     def best_reversed(self):
         ''' Returns the best reversed route '''
         
-        best = self
+        best = None
+        best_cost = self.cost
+        
+        value = [0] + self.value + [0]
+        distances = self.data.distances
         
-        for i in range(len(self.value) - 1):
-            for j in range(i + 1, len(self.value)):
-                route = self.reversed(i, j + 1)
+        segments = self.segments
+        
+        evaluated = checked = 0
+        
+        for i in range(1, len(value) - 2):
+            # Segment of the positions end..i visited backwards, only grown when a candidate is checked
+            reversal, end = segments.customers[i], i
+            
+            for j in range(i + 1, len(value) - 1):
+                evaluated += 1
+                
+                # Reversing value[i..j] only replaces two edges
+                cost = self.cost - distances[value[i - 1], value[i]] - distances[value[j], value[j + 1]]
+                cost += distances[value[i - 1], value[j]] + distances[value[i], value[j + 1]]
+                
+                if cost >= best_cost:
+                    continue
+                
+                checked += 1
                 
-                if route.feasible and route.cost < best.cost:
-                    best = route
+                # Each customer joins the reversed segment once for each i (amortized O(1) per candidate)
+                for end in range(end + 1, j + 1):
+                    reversal = segments.customers[end].concat(reversal, distances)
+                
+                # Check the time windows in O(1) from the cached segments
+                route = segments.prefix[i - 1].concat(reversal, distances)
+                route = route.concat(segments.suffix[j + 1], distances)
+                
+                if route.feasible(self.data.vehicle_capacity):
+                    best = i - 1, j
+                    best_cost = cost
         
-        return best
+        tracer.count('two_opt.moves', evaluated)
+        tracer.count('two_opt.checks', checked)
+        
+        if best is None:
+            return self
+        
+        return self.reversed(*best)
 
     def insertion(self, index: int, customer: Customer):
         ''' Insert a customer at the index '''
@@ -171,6 +214,8 @@ class Route:
         
         best = None
         
+        tracer.count('route.insertions', len(self.value) + 1)
+        
         for idx in range(len(self.value) + 1):
             new = self.insertion(idx, customer)
             
@@ -191,12 +236,21 @@ class Route:
         
         return self.pos[1]
 
+    @property
+    def segments(self) -> RouteSegments:
+        ''' Get the prefix and suffix segments of the route '''
+        
+        if self._segments is None:
+            self._segments = RouteSegments(self.data, self.value)
+        
+        return self._segments
+
     @property
     def cost(self):
         ''' Get the route cost '''
         
         if self._cost < 0:
-            self._cost = self.calculate_cost()
+            self._cost = self.evaluate(0, self.calculate_cost)
         
         return self._cost
     
@@ -205,7 +259,7 @@ class Route:
         ''' Get the route demand '''
         
         if self._demand < 0:
-            self._demand = self.calculate_demand()
+            self._demand = self.evaluate(1, self.calculate_demand)
         
         return self._demand
         
@@ -214,9 +268,32 @@ class Route:
         ''' Get the route time '''
         
         if self._time < 0:
-            self._time = self.calculate_time()
+            self._time = self.evaluate(2, self.calculate_time)
         
         return self._time
+    
+    def evaluate(self, field: int, calculate):
+        ''' Get a field of the evaluation (0 cost, 1 demand, 2 time) from the instance route cache when enabled '''
+        
+        cache = self.data.route_cache
+        
+        if cache is None:
+            return calculate()
+        
+        key = tuple(self.value)
+        
+        # Entries are filled lazily, only the fields asked so far are calculated
+        entry = cache.get(key)
+        
+        if entry is None:
+            entry = [self._cost, self._demand, -1]
+            
+            cache.put(key, entry)
+        
+        if entry[field] < 0:
+            entry[field] = calculate()
+        
+        return entry[field]
         
     def calculate_cost(self):
         ''' Calculate the cost for the route '''
@@ -0,0 +1,64 @@
+from collections import OrderedDict
+
+class RouteCache:
+    ''' Class for a bounded LRU cache of route evaluations ([cost, demand, time], -1 if unknown) keyed by the customer sequence
+    (off by default: on the Solomon instances a lookup costs about as much as the evaluation it saves) '''
+
+    def __init__(self, capacity: int = 100_000):
+        self.capacity = capacity # Maximum number of entries
+
+        self.entries: OrderedDict[tuple[int, ...], list] = OrderedDict() # Evaluations by sequence
+
+        self.hits = 0 # Lookups found in the cache
+        self.misses = 0 # Lookups not found in the cache
+
+    def __len__(self):
+        ''' Get the number of entries '''
+
+        return len(self.entries)
+
+    def get(self, key: tuple[int, ...]) -> list | None:
+        ''' Get the evaluation of a sequence (None if not cached) '''
+
+        entry = self.entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+
+            return None
+
+        self.hits += 1
+
+        self.entries.move_to_end(key)
+
+        return entry
+
+    def put(self, key: tuple[int, ...], entry: list):
+        ''' Store the evaluation of a sequence, dropping the least recently used one when full '''
+
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        ''' Clear the entries and the counters '''
+
+        self.entries.clear()
+
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict[str, float]:
+        ''' Get the cache counters '''
+
+        lookups = self.hits + self.misses
+
+        return {
+            'size': len(self.entries),
+            'capacity': self.capacity,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0,
+        }
@@ -0,0 +1,120 @@
+import numpy as np
+
+from src.data import Data
+
+class Segment:
+    ''' Class for the concatenation data of a sequence of customers (visited in order) '''
+
+    __slots__ = ('first', 'last', 'duration', 'earliest', 'latest', 'warp', 'load', 'distance')
+
+    def __init__(
+        self,
+        first: int,
+        last: int,
+        duration: int,
+        earliest: int,
+        latest: int,
+        warp: int,
+        load: int,
+        distance: int
+    ):
+        self.first = first # First customer
+        self.last = last # Last customer
+        self.duration = duration # Minimum duration (travel, service and waiting)
+        self.earliest = earliest # Earliest start of the first service without extra waiting
+        self.latest = latest # Latest start of the first service without extra lateness
+        self.warp = warp # Lateness that cannot be avoided (0 if the time windows hold)
+        self.load = load # Total demand
+        self.distance = distance # Total distance
+
+    @staticmethod
+    def customer(data: Data, customer: int) -> 'Segment':
+        ''' Create the segment of a single customer '''
+
+        return Segment(
+            customer,
+            customer,
+            int(data.service_times[customer]),
+            int(data.ready_times[customer]),
+            int(data.due_dates[customer]),
+            0,
+            int(data.demands[customer]),
+            0
+        )
+
+    def concat(self, other: 'Segment', distances: np.ndarray) -> 'Segment':
+        ''' Concatenate two segments in O(1) '''
+
+        travel = distances[self.last, other.first]
+
+        delta = self.duration - self.warp + travel
+
+        waiting = max(other.earliest - delta - self.latest, 0)
+        warp = max(self.earliest + delta - other.latest, 0)
+
+        return Segment(
+            self.first,
+            other.last,
+            self.duration + other.duration + travel + waiting,
+            max(other.earliest - delta, self.earliest) - waiting,
+            min(other.latest - delta, self.latest) + warp,
+            self.warp + other.warp + warp,
+            self.load + other.load,
+            self.distance + other.distance + travel
+        )
+
+    @staticmethod
+    def merge(distances: np.ndarray, *segments: 'Segment') -> 'Segment':
+        ''' Concatenate several segments '''
+
+        result = segments[0]
+
+        for segment in segments[1:]:
+            result = result.concat(segment, distances)
+
+        return result
+
+    @property
+    def time(self):
+        ''' Get the earliest completion time (inf if the time windows do not hold) '''
+
+        if self.warp > 0:
+            return float('inf')
+
+        return self.earliest + self.duration
+
+    def feasible(self, capacity: int) -> bool:
+        ''' Check if the segment respects the time windows and the capacity '''
+
+        return self.warp == 0 and self.load <= capacity
+
+class RouteSegments:
+    ''' Class for the prefix and suffix segments of a route (depot included on both ends) '''
+
+    def __init__(self, data: Data, value: list[int]):
+        self.data = data # CVRPTW instance
+
+        # Positions of the route with the depot on both ends: [0, c_1, ..., c_n, 0]
+        self.value = [0] + list(value) + [0]
+
+        self.customers = [Segment.customer(data, c) for c in self.value] # Segment of each position
+
+        self.prefix: list[Segment] = [self.customers[0]] # Segment of the positions 0..k
+        for segment in self.customers[1:]:
+            self.prefix.append(self.prefix[-1].concat(segment, data.distances))
+
+        self.suffix: list[Segment] = [self.customers[-1]] # Segment of the positions k..n + 1
+        for segment in reversed(self.customers[:-1]):
+            self.suffix.append(segment.concat(self.suffix[-1], data.distances))
+        self.suffix.reverse()
+
+    def __len__(self):
+        ''' Get the number of positions (depot included on both ends) '''
+
+        return len(self.value)
+
+    @property
+    def route(self) -> Segment:
+        ''' Get the segment of the whole route '''
+
+        return self.prefix[-1]
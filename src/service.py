@@ -0,0 +1,176 @@
+import asyncio
+
+from os import path
+from time import perf_counter
+from tempfile import TemporaryDirectory
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src.data import Data
+from src.k_means import KMeans
+from src.fleet_search import FleetSearch
+from src.two_opt import TwoOpt
+from src.local_search import LocalSearch
+from src.k_neighbors import KNeighbors
+from src.solver import Solver
+
+class SolveService:
+    ''' Class for solving instances concurrently from asyncio (heuristics in worker processes, clasp as a subprocess) '''
+
+    def __init__(
+        self,
+        max_solves: int = 1,
+        max_workers: int | None = None,
+        time_limit: int = 100,
+        clasp: str = './clasp'
+    ):
+        self.max_solves = max_solves # Clasp processes running at once
+        self.max_workers = max_workers # Worker processes for the heuristic stages (None for the CPU count)
+        self.time_limit = time_limit # Clasp time limit (seconds) unless the deadline is closer
+        self.clasp = path.abspath(clasp) # Clasp executable
+
+        self.executor: ProcessPoolExecutor | None = None # Worker processes
+        self.semaphore: asyncio.Semaphore | None = None # Bounds the running clasp processes
+
+    async def __aenter__(self):
+        self.executor = ProcessPoolExecutor(self.max_workers)
+        self.semaphore = asyncio.Semaphore(self.max_solves)
+
+        return self
+
+    async def __aexit__(self, *exc):
+        self.executor.shutdown(cancel_futures=True)
+
+        return False
+
+    async def solve(
+        self,
+        instance: str | dict,
+        vehicle_number: int | None = None,
+        k_neighbors: int = 5,
+        random_state: int | None = 0,
+        deadline: float | None = None
+    ) -> dict:
+        ''' Solve an instance (file or customer rows) within the deadline (seconds), returning the routes and stage times '''
+
+        start = perf_counter()
+
+        if deadline is None:
+            return await self.run(instance, vehicle_number, k_neighbors, random_state, None)
+
+        # wait_for rather than asyncio.timeout (Python 3.11+), raises asyncio.TimeoutError
+        return await asyncio.wait_for(
+            self.run(instance, vehicle_number, k_neighbors, random_state, start + deadline), deadline
+        )
+
+    async def run(
+        self,
+        instance: str | dict,
+        vehicle_number: int | None,
+        k_neighbors: int,
+        random_state: int | None,
+        end: float | None
+    ) -> dict:
+        ''' Run the heuristics in a worker process, then clasp on the model they write '''
+
+        loop = asyncio.get_running_loop()
+
+        with TemporaryDirectory() as directory:
+            input_file = path.join(directory, 'input.txt')
+
+            stages, solver = await loop.run_in_executor(
+                self.executor, prepare, instance, vehicle_number, k_neighbors, random_state, input_file
+            )
+
+            async with self.semaphore:
+                time_limit = self.time_limit
+
+                if end is not None:
+                    time_limit = max(min(time_limit, int(end - perf_counter())), 1)
+
+                start = perf_counter()
+                output = await self.run_clasp(input_file, time_limit)
+                stages['solve'] = perf_counter() - start
+
+        routes = solver.decode(output)
+
+        return {
+            'name': solver.data.name,
+            'vehicles': len(routes),
+            'cost': float(sum(route.cost for route in routes)),
+            'routes': [[customer for customer in route.value if customer != 0] for route in routes],
+            'stages': stages,
+        }
+
+    async def run_clasp(self, input_file: str, time_limit: int) -> list[str]:
+        ''' Run clasp on a model file (killed if the request is cancelled) '''
+
+        process = await asyncio.create_subprocess_exec(
+            self.clasp, input_file, f'--time-limit={time_limit}',
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+
+        try:
+            output, _ = await process.communicate()
+        finally:
+            if process.returncode is None:
+                process.kill()
+
+                await process.wait()
+
+        return output.decode().splitlines()
+
+def load_instance(instance: str | dict) -> Data:
+    ''' Load an instance from a file or from its customer rows (name, max_vehicle_number, vehicle_capacity, rows) '''
+
+    if isinstance(instance, str):
+        return Data(instance).load()
+
+    return Data.from_rows(
+        instance.get('name', ''),
+        instance['max_vehicle_number'],
+        instance['vehicle_capacity'],
+        np.asarray(instance['rows'])
+    )
+
+def prepare(
+    instance: str | dict,
+    vehicle_number: int | None,
+    k_neighbors: int,
+    random_state: int | None,
+    input_file: str
+) -> tuple[dict[str, float], Solver]:
+    ''' Run the heuristic stages and write the model (runs in a worker process) '''
+
+    stages: dict[str, float] = {}
+
+    start = perf_counter()
+    data = load_instance(instance)
+    stages['load'] = perf_counter() - start
+
+    if vehicle_number is None:
+        stages['fleet_search'], _, routes = FleetSearch(data, random_state=random_state).run()
+    else:
+        stages['k_means'], routes = KMeans(data, vehicle_number, random_state=random_state).run()
+
+    stages['two_opt'], routes = TwoOpt(routes).run()
+    stages['local_search'], routes = LocalSearch(data, routes).run()
+    stages['k_neighbors'], matrices = KNeighbors(data, k_neighbors, routes).run()
+
+    solver = Solver(data, matrices)
+
+    start = perf_counter()
+    solver.load_model()
+
+    with open(input_file, 'w') as file:
+        file.write(solver.encode())
+
+    stages['load_model'] = perf_counter() - start
+
+    # Only the mapping is needed to decode the output
+    solver.constraints = []
+    solver.objectives = []
+
+    return stages, solver
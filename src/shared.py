@@ -0,0 +1,53 @@
+import numpy as np
+
+from multiprocessing import shared_memory, resource_tracker
+
+class SharedArray:
+    ''' Class for a NumPy array placed in shared memory (use it as a context manager in the owner process) '''
+
+    def __init__(self, array: np.ndarray):
+        self.memory = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+
+        self.array = np.ndarray(array.shape, dtype=array.dtype, buffer=self.memory.buf)
+        self.array[...] = array
+
+    @property
+    def spec(self) -> tuple[str, tuple[int, ...], str]:
+        ''' Get what a worker needs to attach the array (name, shape, dtype) '''
+
+        return self.memory.name, self.array.shape, self.array.dtype.str
+
+    @staticmethod
+    def attach(spec: tuple[str, tuple[int, ...], str]) -> tuple[shared_memory.SharedMemory, np.ndarray]:
+        ''' Attach an array from its spec (keep the memory alive while the array is used) '''
+
+        name, shape, dtype = spec
+
+        # Only the owner process tracks (and unlinks) the memory
+        try:
+            memory = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Python < 3.13 always tracks attached memory: the tracker would then unlink it (or warn about a leak)
+            # when the worker exits, while the owner still uses it. Skipping the registration is safe since the
+            # owner registered the memory when creating it and unlinks it in __exit__, and the patch only covers
+            # this call in the worker initializer (no other thread registers resources meanwhile)
+            register = resource_tracker.register
+            resource_tracker.register = lambda *args: None
+
+            try:
+                memory = shared_memory.SharedMemory(name=name)
+            finally:
+                resource_tracker.register = register
+
+        return memory, np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        del self.array
+
+        self.memory.close()
+        self.memory.unlink()
+
+        return False
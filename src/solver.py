@@ -1,19 +1,45 @@
-from os import system, remove
+from os import remove, wait4, waitstatus_to_exitcode
 from math import log2, ceil
+from subprocess import Popen, PIPE
 
 import numpy as np
 
 from src.data import Data
 from src.route import Route
+from src.lower_bound import LowerBound
 from src.utils import timer
+from src.tracer import tracer
+
+# Items formatted at once by encode_block
+BLOCK_ITEMS = 1 << 20
+
+# Safety margin of the memory estimate (the peaks measured on solomon_25 and solomon_50 are 31-38% under it)
+MEMORY_MARGIN = 1.1
 
 class Solver:
     ''' Class for the solver '''
     
-    def __init__(self, data: Data, matrices: list[np.ndarray], use_lima: bool = False):
+    def __init__(
+        self, 
+        data: Data, 
+        matrices: list[np.ndarray], 
+        use_lima: bool | None = False,
+        time_limit: int = 100,
+        gap: float | None = None,
+        lower_bound: float | None = None,
+        memory_budget: int | None = None
+    ):
         self.data = data # CVRPTW instance
         self.matrices = matrices # Matrices list
-        self.use_lima = use_lima # Use Lima approach
+        self.use_lima = use_lima # Use Lima approach (None to pick the smallest encoding within the memory budget)
+        self.time_limit = time_limit # Clasp time limit (seconds)
+        self.gap = gap # Stop once (incumbent - lower bound) / incumbent is within this gap (None to run clasp to the end)
+        self.lower_bound = lower_bound # Lower bound of the objective (computed when a gap is given)
+        self.memory_budget = memory_budget # Estimated memory allowed for the model (bytes, None for no limit)
+        
+        self.incumbent: int | None = None # Cost of the last model found by clasp (with a gap)
+        self.clasp_memory: int | None = None # Peak memory of the last clasp run (bytes)
+        self.downgraded = False # The requested encoding exceeded the memory budget and the other one is used
         
         self.counter = 1
         
@@ -70,6 +96,72 @@ class Solver:
     def add_objective(self, factor: int, literal: int):
         self.objectives.append(self.encode_literal(factor, literal))
 
+    def create_variables(self, names: list[str]) -> int:
+        ''' Create a block of variables with consecutive literals (returns the first one) '''
+        
+        first = self.counter
+        literals = range(first, first + len(names))
+        
+        self.mapping.update(zip(names, literals))
+        self.mapping_inv.update(zip(literals, names))
+        
+        self.counter += len(names)
+        
+        return first
+
+    def encode_block(self, factors, clauses: np.ndarray, operator: str, values) -> list[str]:
+        ''' Encode a block of clauses with the same length (one per row) '''
+        
+        clauses = np.asarray(clauses)
+        
+        if clauses.size == 0:
+            return []
+        
+        rows, length = clauses.shape
+        
+        factors = np.broadcast_to(factors, clauses.shape)
+        values = np.broadcast_to(values, (rows,))
+        
+        row = ' '.join(['%d %sx%d'] * length) + f' {operator} %d ;'
+        
+        # Format a chunk of rows at once (bounding the temporary objects)
+        chunk = max(BLOCK_ITEMS // (3 * length + 1), 1)
+        
+        lines: list[str] = []
+        
+        for start in range(0, rows, chunk):
+            end = min(start + chunk, rows)
+            
+            items = np.empty((end - start, 3 * length + 1), dtype=object)
+            
+            items[:, 0:-1:3] = factors[start:end]
+            items[:, 1:-1:3] = np.where(clauses[start:end] >= 0, '', '~')
+            items[:, 2:-1:3] = np.abs(clauses[start:end])
+            items[:, -1] = values[start:end]
+            
+            lines += ('\n'.join([row] * (end - start)) % tuple(items.ravel().tolist())).split('\n')
+        
+        return lines
+
+    def add_constraints(self, factors, clauses: np.ndarray, operator: str, values):
+        ''' Add a block of clauses with the same length and operator (factors and values are broadcast) '''
+        
+        self.constraints += self.encode_block(factors, clauses, operator, values)
+
+    def add_objectives(self, factors, literals: np.ndarray):
+        ''' Add a block of literals to the objective '''
+        
+        factors = np.broadcast_to(factors, np.shape(literals)).ravel()
+        literals = np.ravel(literals)
+        
+        items = np.empty((len(literals), 3), dtype=object)
+        
+        items[:, 0] = factors
+        items[:, 1] = np.where(literals >= 0, '', '~')
+        items[:, 2] = np.abs(literals)
+        
+        self.objectives += ('\n'.join(['%d %sx%d'] * len(literals)) % tuple(items.ravel().tolist())).split('\n')
+
     def create_objective_string(self):
         ''' Create the objective '''
         
@@ -99,6 +191,8 @@ class Solver:
                 raise Exception('Cannot find a solution')
             
             if line.startswith('o'): 
+                tracer.count('clasp.incumbents')
+                
                 continue
             
             if line.startswith('v'):
@@ -131,17 +225,91 @@ class Solver:
             
         return routes
     
+    def run_clasp_gap(self) -> list[str]:
+        ''' Run clasp until the incumbent is within the gap of the lower bound (returns the output of the last model) '''
+        
+        if self.lower_bound is None:
+            _, self.lower_bound = LowerBound(self.data, len(self.matrices), self.matrices).run()
+        
+        # Print every model (its values come before its cost)
+        process = Popen(
+            ['./clasp', 'input.txt', f'--time-limit={self.time_limit}', '--quiet=0'], 
+            stdout=PIPE, 
+            text=True
+        )
+        
+        output: list[str] = []
+        model: list[str] = []
+        
+        for line in process.stdout:
+            if line.startswith('v'):
+                model.append(line)
+                
+                continue
+            
+            if line.startswith('o'):
+                tracer.count('clasp.incumbents')
+                
+                output = model
+                model = []
+                
+                self.incumbent = int(line.split()[1])
+                
+                if self.incumbent - self.lower_bound <= self.gap * self.incumbent:
+                    tracer.count('solver.gap_stops')
+                    
+                    process.terminate()
+                    
+                    break
+                
+                continue
+            
+            if line.startswith('s'):
+                output.append(line)
+        
+        process.stdout.close()
+        self.wait_clasp(process)
+        
+        return output
+    
+    def wait_clasp(self, process: Popen):
+        ''' Wait for clasp and keep its own peak memory (not the peak of every child so far) '''
+        
+        _, status, usage = wait4(process.pid, 0)
+        
+        process.returncode = waitstatus_to_exitcode(status)
+        
+        # Kilobytes on Linux
+        self.clasp_memory = usage.ru_maxrss * 1024
+    
     def solve(self):
         ''' Solve the model '''
         
         try:
-            with open('input.txt', 'w+') as input_file:
-                input_file.write(self.encode())
+            with tracer.span('solver.encode'):
+                with open('input.txt', 'w+') as input_file:
+                    input_file.write(self.encode())
+            
+            if self.gap is not None:
+                with tracer.span('solver.clasp'):
+                    output = self.run_clasp_gap()
+                
+                with tracer.span('solver.decode'):
+                    routes = self.decode(output)
+                
+                remove('input.txt')
+                
+                return routes
             
-            system(f'./clasp input.txt > output.txt --time-limit=100')
+            with tracer.span('solver.clasp'):
+                with open('output.txt', 'w') as output_file:
+                    process = Popen(['./clasp', 'input.txt', f'--time-limit={self.time_limit}'], stdout=output_file)
+                
+                    self.wait_clasp(process)
             
-            with open('output.txt', 'r') as output_file:
-                routes = self.decode(output_file.readlines())
+            with tracer.span('solver.decode'):
+                with open('output.txt', 'r') as output_file:
+                    routes = self.decode(output_file.readlines())
         
             remove('input.txt')
             remove('output.txt')
@@ -153,252 +321,339 @@ class Solver:
             
             raise Exception('Cannot solve the model')
         
-    def load_model(self):
-        ''' Load the model '''
+    def load_variables(self, u_bits: int) -> tuple[np.ndarray, np.ndarray, np.ndarray | None, np.ndarray | None]:
+        ''' Create the u, t, c and w variables of every vehicle (returns their literals as arrays) '''
+        
+        n = len(self.data.customers)
+        vehicles = len(self.matrices)
+        
+        customers = np.arange(n)
         
-        u_bits = ceil(log2(len(self.data.customers) - 1))
+        # Variables of each (v, i) in order: u_i_b_v, t_i_v, then c_i_j_v and w_i_j_v for each j
+        bits = np.where((customers != 0) & (not self.use_lima), u_bits, 0)
+        sizes = np.broadcast_to(bits + 1 + (n if self.use_lima else 0) + n - 1, (vehicles, n)).ravel()
+        
+        first = self.counter
+        starts = (first + np.cumsum(sizes) - sizes).reshape(vehicles, n)
+        
+        t = starts + bits
+        
+        # Number of w variables before j in the row of i
+        before = customers[None, :] - (customers[None, :] > customers[:, None])
         
         if self.use_lima:
-            c: list[int] = []
+            c = t[:, :, None] + 1 + customers[None, None, :] + before
+            w = c + 1
         else:
-            u: list[int] = []    
+            c = None
+            w = t[:, :, None] + 1 + before
         
-        t: list[int] = []
-        w: list[int] = []
-    
-        # Create the variables
-        for v in range(len(self.matrices)):   
-            for i in range(len(self.data.customers)):
-                if i != 0:
-                    if not self.use_lima:
-                        for b in range(u_bits):
-                            u.append(self.get(f'u_{i}_{b}_{v}'))
+        u = None
+        if not self.use_lima:
+            u = starts[:, :, None] + np.arange(u_bits)
+        
+        w[:, customers, customers] = 0
+        
+        names: list[str] = [''] * int(sizes.sum())
+        
+        for v in range(vehicles):
+            for i in range(n):
+                names[t[v, i] - first] = f't_{i}_{v}'
                 
-                t.append(self.get(f't_{i}_{v}'))
+                if i != 0 and u is not None:
+                    for b, literal in enumerate(u[v, i].tolist()):
+                        names[literal - first] = f'u_{i}_{b}_{v}'
                 
-                for j in range(len(self.data.customers)):
-                    if self.use_lima:
-                        c.append(self.get(f'c_{i}_{j}_{v}'))
-                    
+                for j, literal in enumerate(w[v, i].tolist()):
                     if i != j:
-                        w.append(self.get(f'w_{i}_{j}_{v}'))
+                        names[literal - first] = f'w_{i}_{j}_{v}'
+                
+                if c is not None:
+                    for j, literal in enumerate(c[v, i].tolist()):
+                        names[literal - first] = f'c_{i}_{j}_{v}'
         
-        # Each vehicle leaves the depot by one customer
-        for v in range(len(self.matrices)):
-            w_0_j_v = [self.get(f'w_0_{j}_{v}') for j in range(1, len(self.data.customers))]
-            
-            self.add_constraint_eq(None, w_0_j_v, 1)
-            
-        # Each vehicle enters the depot by one customer
-        for v in range(len(self.matrices)):
-            w_i_0_v = [self.get(f'w_{i}_0_{v}') for i in range(1, len(self.data.customers))]
-
-            self.add_constraint_eq(None, w_i_0_v, 1)
-            
-        # A customer leaves only to one customer and by one vehicle
-        for i in range(1, len(self.data.customers)):
-            w_i_j_v: list[int] = []
-            
-            for v in range(len(self.matrices)):
-                w_i_j_v += [self.get(f'w_{i}_{j}_{v}') for j in range(len(self.data.customers)) if i != j]
-            
-            self.add_constraint_eq(None, w_i_j_v, 1)
+        self.create_variables(names)
         
-        # A customer enters only by one customer and by one vehicle
-        for j in range(1, len(self.data.customers)):
-            w_i_j_v: list[int] = []
-            
-            for v in range(len(self.matrices)):
-                w_i_j_v += [self.get(f'w_{i}_{j}_{v}') for i in range(len(self.data.customers)) if i != j]
-            
-            self.add_constraint_eq(None, w_i_j_v, 1)
+        return u, t, c, w
+    
+    def estimate(self, use_lima: bool) -> dict[str, int]:
+        ''' Estimate the number of variables and constraints, the encoded size and the peak memory of an encoding
+        (the counts are exact, the size and the memory are approximate and kept above the measured values) '''
+        
+        n = len(self.data.customers)
+        vehicles = len(self.matrices)
+        
+        u_bits = ceil(log2(n - 1))
+        T_bits = ceil(log2(self.data.depot.due_date))
+        
+        removed = sum(int((matrix == -1).sum()) for matrix in self.matrices)
+        
+        variables = vehicles * (n + n * (n - 1)) + n * T_bits
+        
+        if use_lima:
+            variables += vehicles * n * n
+        else:
+            variables += vehicles * (n - 1) * u_bits
+        
+        # Characters of a literal with a small factor ('1 ~x123 ' or '-1 x123 ') and with a large one
+        small = len(str(variables)) + 5
+        large = small + 4
+        
+        # (constraints, literals of each one, characters of each literal)
+        families = [
+            (2 * vehicles, n - 1, small), # Depot
+            (2 * (n - 1), vehicles * (n - 1), small), # Flow
+            (vehicles * (n - 1) * (n - 2) // 2, 2, small), # Pairs
+            (2 * vehicles * (n - 1) * (n - 2), 2, small), # Visits
+            ((n - 1) * vehicles * (vehicles - 1), 2, small), # One vehicle
+            (2 * (n - 1) * vehicles, 2, small), # Depot visits
+            (vehicles, n, large), # Capacity
+            (3 * (n - 1) + 1, T_bits, large), # Time windows and return to the depot
+            ((n - 1) ** 2, 2 * T_bits + vehicles, large), # Time between customers
+            (1, removed, small), # Removed arcs
+        ]
+        
+        if use_lima:
+            families += [
+                (vehicles * n * (n - 1), 2, small), # Base way
+                (n - 1, vehicles, small), # No loops
+            ]
             
-        # A vehicle cannot enter and leave the same customer
-        for i in range(1, len(self.data.customers)):
-            for j in range(i + 1, len(self.data.customers)):
-                for v in range(len(self.matrices)):
-                    w_i_j_v = self.get(f'w_{i}_{j}_{v}')
-                    w_j_i_v = self.get(f'w_{j}_{i}_{v}')
-                    
-                    self.add_constraint_geq(None, [-w_i_j_v, -w_j_i_v], 1)
-                    
-        # If a vehicle leaves a customer and visits another one then both customers was visited
-        for i in range(1, len(self.data.customers)):
-            for j in range(1, len(self.data.customers)):
-                for v in range(len(self.matrices)):
-                    if i == j:
-                        continue
-                        
-                    w_i_j_v = self.get(f'w_{i}_{j}_{v}')
-                    t_i_v = self.get(f't_{i}_{v}')
-                    t_j_v = self.get(f't_{j}_{v}')
-                    
-                    self.add_constraint_geq(None, [-w_i_j_v, t_i_v], 1)
-                    self.add_constraint_geq(None, [-w_i_j_v, t_j_v], 1)
-        
-        # A customer is only visited by one vehicle
-        for i in range(1, len(self.data.customers)):
-            for v in range(len(self.matrices)):
-                for l in range(len(self.matrices)):
-                    if v == l:
-                        continue
-                        
-                    t_i_v = self.get(f't_{i}_{v}')
-                    t_i_l = self.get(f't_{i}_{l}')
-                    
-                    self.add_constraint_geq(None, [-t_i_v, -t_i_l], 1)
+            # Induction path (one block for each customer)
+            families += [(vehicles * (n - 1) * (n - 2), 3, small)] * (n - 1)
+        else:
+            families += [(vehicles * (n - 1) * (n - 2), 2 * u_bits + 1, large)] # MTZ
+        
+        # Operator, value and line break of each constraint
+        tail = 10
+        
+        constraints = sum(rows for rows, _, _ in families)
+        size = sum(rows * (literals * chars + tail) for rows, literals, chars in families)
+        size += vehicles * n * (n - 1) * small # Objective
+        
+        # Items formatted at once by the largest block (objective included)
+        items = max(rows * (3 * literals + 1) for rows, literals, _ in families)
+        items = min(max(items, 3 * vehicles * n * (n - 1)), BLOCK_ITEMS)
+        
+        # Building: constraint strings and their encoded copy, both variable mappings and the block being formatted
+        building = 2 * size + 57 * constraints + 250 * variables + 48 * items
+        
+        # Encoding: constraint strings, the joined string and its copies in encode, both variable mappings
+        encoding = 4 * size + 57 * constraints + 250 * variables
+        
+        memory = int(MEMORY_MARGIN * max(building, encoding))
+        
+        return {'variables': variables, 'constraints': constraints, 'bytes': size, 'memory': memory}
+    
+    def select_encoding(self):
+        ''' Pick the encoding (the smallest one if not given, the other one if it exceeds the memory budget) '''
+        
+        estimates = {use_lima: self.estimate(use_lima) for use_lima in (False, True)}
+        
+        candidates = sorted(estimates, key=lambda use_lima: estimates[use_lima]['bytes'])
+        
+        if self.use_lima is not None:
+            candidates.remove(self.use_lima)
+            candidates.insert(0, self.use_lima)
+        
+        for use_lima in candidates:
+            if self.memory_budget is None or estimates[use_lima]['memory'] <= self.memory_budget:
+                if self.use_lima is not None and use_lima != self.use_lima:
+                    tracer.count('solver.downgrades')
                     
-        # A vehicle visits a customer before enters and after leaving the depot
-        for ij in range(1, len(self.data.customers)):
-            for v in range(len(self.matrices)):
-                w_0_ij_v = self.get(f'w_{0}_{ij}_{v}')
-                w_ij_0_v = self.get(f'w_{ij}_{0}_{v}')
-                t_ij_v = self.get(f't_{ij}_{v}')
+                    self.downgraded = True
+                
+                self.use_lima = use_lima
                 
-                self.add_constraint_geq(None, [-w_0_ij_v, t_ij_v], 1)
-                self.add_constraint_geq(None, [-w_ij_0_v, t_ij_v], 1)
+                return estimates[use_lima]
         
-        # Subtour Elimination (Lima)
-        if self.use_lima:
-            # BASE WAY
-            for i in range(len(self.data.customers)):
-                for j in range(len(self.data.customers)):
-                    if i != j:
-                        for v in range(len(self.matrices)):
-                            w_i_j_v = self.get(f"w_{i}_{j}_{v}")
-                            c_i_j_v = self.get(f"c_{i}_{j}_{v}")
-                            self.add_constraint_geq(None, [-w_i_j_v, c_i_j_v], 1)
-            #INDUCTION PATH 
-            for i in range(1, len(self.data.customers)):
-                for j in range(1, len(self.data.customers)):
-                    for k in range(1, len(self.data.customers)):
-                        if i != j:
-                            for v in range(len(self.matrices)):
-                                w_i_j_v = self.get(f"w_{i}_{j}_{v}")
-                                c_j_k_v = self.get(f"c_{j}_{k}_{v}")
-                                c_i_k_v = self.get(f"c_{i}_{k}_{v}")
-                                self.add_constraint_geq(None, [-w_i_j_v, -c_j_k_v, c_i_k_v], 1)
-
-            for i in range(len(self.data.customers)):
-                if i != 0:
-                    c_i_i_v = [self.get(f"c_{i}_{i}_{v}") for v in range(len(self.matrices))]
-                    self.add_constraint_eq(None, c_i_i_v, 0)
-        else: 
-            # Subtour Elimination (MTZ)
-            exp = [2 ** b for b in range(u_bits)]
-            neg_exp = [-item for item in exp]
-            
-            u_factors = neg_exp + exp + [-len(self.data.customers) + 1]
-            u_value = -len(self.data.customers) + 2
-            
-            for v in range(len(self.matrices)):
-                for i in range(1, len(self.data.customers)):
-                    for j in range(1, len(self.data.customers)):
-                        if i == j:
-                            continue
-                            
-                        u_i_v = [self.get(f'u_{i}_{b}_{v}') for b in range(u_bits)]
-                        u_j_v = [self.get(f'u_{j}_{b}_{v}') for b in range(u_bits)]
-                        
-                        w_i_j_v = self.get(f'w_{i}_{j}_{v}')
-                        
-                        u_clause = u_i_v + u_j_v + [w_i_j_v]
-
-                        self.add_constraint_geq(u_factors, u_clause, u_value)
+        raise MemoryError(f'The model needs at least {min(e["memory"] for e in estimates.values())} bytes')
+    
+    def load_model(self):
+        ''' Load the model '''
         
-        # A vehicle cannot exceed its capacity
-        neg_demands = [-c.demand for c in self.data.customers]
-        for v in range(len(self.matrices)):
-            t_i_v = [self.get(f't_{i}_{v}') for i in range(len(self.data.customers))]
-            
-            self.add_constraint_geq(neg_demands, t_i_v, -self.data.vehicle_capacity)
+        self.select_encoding()
         
-        # TIME CONSTRAINTS
+        n = len(self.data.customers)
+        vehicles = len(self.matrices)
         
-        T_bits = ceil(log2(self.data.depot.due_date))
+        u_bits = ceil(log2(n - 1))
         
-        exp = [2 ** b for b in range(T_bits)]
-        neg_exp = [-item for item in exp]
+        distances = np.rint(self.data.distances).astype(int)
         
-        for i, customer in enumerate(self.data.customers):
-            if i == 0:
-                continue
+        # Pairs (i, j) with i != j
+        pairs = ~np.eye(n, dtype=bool)
+    
+        with tracer.span('model.variables'):
+            # Create the variables
+            u, t, c, w = self.load_variables(u_bits)
+        
+        with tracer.span('model.depot'):
+            # Each vehicle leaves the depot by one customer
+            self.add_constraints(1, w[:, 0, 1:], '=', 1)
             
-            T_i = [self.get(f'T_{i}_{b}') for b in range(T_bits)]
+            # Each vehicle enters the depot by one customer
+            self.add_constraints(1, w[:, 1:, 0], '=', 1)
             
-            self.add_constraint_geq(exp, T_i, customer.ready_time)
-            self.add_constraint_geq(neg_exp, T_i, -customer.due_date)
-        
-        T_0 = [self.get(f'T_{0}_{b}') for b in range(T_bits)]
-        self.add_constraint_eq(exp, T_0, 0)
+        with tracer.span('model.flow'):
+            # A customer leaves only to one customer and by one vehicle
+            leaving = w[:, pairs].reshape(vehicles, n, n - 1)
+            
+            self.add_constraints(1, leaving[:, 1:].transpose(1, 0, 2).reshape(n - 1, -1), '=', 1)
         
-        for i, customer_i in enumerate(self.data.customers):
-            for j, customer_j in enumerate(self.data.customers):
-                if i == j:
-                    continue
-                
-                if j == 0:
-                    
-                    # CHECK IF THE VEHICLE CAN RETURN TO THE DEPOT
-                    
-                    w_i_j_v = [self.get(f'w_{i}_{j}_{v}') for v in range(len(self.matrices))]
-                    T_i = [self.get(f'T_{i}_{b}') for b in range(T_bits)]
+            # A customer enters only by one customer and by one vehicle
+            entering = w.transpose(0, 2, 1)[:, pairs].reshape(vehicles, n, n - 1)
+            
+            self.add_constraints(1, entering[:, 1:].transpose(1, 0, 2).reshape(n - 1, -1), '=', 1)
+            
+        with tracer.span('model.pairs'):
+            # A vehicle cannot enter and leave the same customer
+            i, j = np.triu_indices(n, 1)
+            i, j = i[i != 0], j[i != 0]
+            
+            clauses = np.stack([-w[:, i, j].T, -w[:, j, i].T], axis=-1)
+            
+            self.add_constraints(1, clauses.reshape(-1, 2), '>=', 1)
                     
-                    factors = []
-                    clause = []
+        with tracer.span('model.visits'):
+            # If a vehicle leaves a customer and visits another one then both customers was visited
+            i, j = np.nonzero(pairs[1:, 1:])
+            i, j = i + 1, j + 1
+            
+            w_i_j = w[:, i, j].T
+            
+            clauses = np.stack([
+                np.stack([-w_i_j, t[:, i].T], axis=-1), 
+                np.stack([-w_i_j, t[:, j].T], axis=-1)
+            ], axis=2)
+            
+            self.add_constraints(1, clauses.reshape(-1, 2), '>=', 1)
+        
+        with tracer.span('model.one_vehicle'):
+            # A customer is only visited by one vehicle
+            v, l = np.nonzero(~np.eye(vehicles, dtype=bool))
+            
+            clauses = np.stack([-t[v, 1:].T, -t[l, 1:].T], axis=-1)
+            
+            self.add_constraints(1, clauses.reshape(-1, 2), '>=', 1)
                     
-                    factors += neg_exp
-                    clause += T_i
+        with tracer.span('model.depot_visits'):
+            # A vehicle visits a customer before enters and after leaving the depot
+            clauses = np.stack([
+                np.stack([-w[:, 0, 1:], t[:, 1:]], axis=-1), 
+                np.stack([-w[:, 1:, 0], t[:, 1:]], axis=-1)
+            ], axis=2)
+            
+            self.add_constraints(1, clauses.transpose(1, 0, 2, 3).reshape(-1, 2), '>=', 1)
+        
+        with tracer.span('model.subtour'):
+            # Subtour Elimination (Lima)
+            if self.use_lima:
+                # BASE WAY
+                i, j = np.nonzero(pairs)
+                
+                clauses = np.stack([-w[:, i, j].T, c[:, i, j].T], axis=-1)
+                
+                self.add_constraints(1, clauses.reshape(-1, 2), '>=', 1)
+                
+                #INDUCTION PATH 
+                for i in range(1, n):
+                    j = np.array([j for j in range(1, n) if j != i], dtype=int)
                     
-                    factors += [-round(self.data.distances[i, j])] * len(w_i_j_v)
-                    factors += w_i_j_v
+                    # (v, j, k) for every customer k
+                    w_i_j = np.broadcast_to(w[:, i, j][:, :, None], (vehicles, len(j), n - 1))
+                    c_j_k = c[:, j, 1:]
+                    c_i_k = np.broadcast_to(c[:, i, None, 1:], (vehicles, len(j), n - 1))
                     
-                    self.add_constraint_geq(factors, clause, -self.data.depot.due_date)
+                    clauses = np.stack([-w_i_j, -c_j_k, c_i_k], axis=-1)
                     
-                    continue
-                
-                w_i_j_v = [self.get(f'w_{i}_{j}_{v}') for v in range(len(self.matrices))]
-                T_i = [self.get(f'T_{i}_{b}') for b in range(T_bits)]
-                T_j = [self.get(f'T_{j}_{b}') for b in range(T_bits)]
+                    self.add_constraints(1, clauses.transpose(1, 2, 0, 3).reshape(-1, 3), '>=', 1)
+
+                customers = np.arange(1, n)
                 
-                factors = []
-                clause = []
+                self.add_constraints(1, c[:, customers, customers].T, '=', 0)
+            else: 
+                # Subtour Elimination (MTZ)
+                exp = [2 ** b for b in range(u_bits)]
+                neg_exp = [-item for item in exp]
+            
+                u_factors = neg_exp + exp + [-n + 1]
+                u_value = -n + 2
                 
-                factors += exp + neg_exp
-                clause += T_j + T_i
+                i, j = np.nonzero(pairs[1:, 1:])
+                i, j = i + 1, j + 1
                 
-                factors += [-self.data.depot.due_date] * len(w_i_j_v)
-                clause += w_i_j_v
+                clauses = np.concatenate([u[:, i], u[:, j], w[:, i, j, None]], axis=-1)
                 
-                value = customer_i.service_time + round(self.data.distances[i, j]) - self.data.depot.due_date
+                self.add_constraints(u_factors, clauses.reshape(-1, 2 * u_bits + 1), '>=', u_value)
+        
+        with tracer.span('model.capacity'):
+            # A vehicle cannot exceed its capacity
+            self.add_constraints(-self.data.demands, t, '>=', -self.data.vehicle_capacity)
+        
+        with tracer.span('model.time'):
+            # TIME CONSTRAINTS
+        
+            T_bits = ceil(log2(self.data.depot.due_date))
+        
+            exp = np.array([2 ** b for b in range(T_bits)])
+            
+            # T_i_b of the customers, then of the depot
+            T = np.empty((n, T_bits), dtype=int)
+            
+            first = self.create_variables([f'T_{i}_{b}' for i in range(1, n) for b in range(T_bits)])
+            T[1:] = first + np.arange((n - 1) * T_bits).reshape(n - 1, T_bits)
+            
+            first = self.create_variables([f'T_{0}_{b}' for b in range(T_bits)])
+            T[0] = first + np.arange(T_bits)
+            
+            windows = np.stack([self.data.ready_times[1:], -self.data.due_dates[1:]], axis=-1)
+            
+            self.add_constraints(
+                np.tile([exp, -exp], (n - 1, 1)), 
+                np.repeat(T[1:], 2, axis=0), 
+                '>=', 
+                windows.ravel()
+            )
+            
+            self.add_constraints(exp, T[None, 0], '=', 0)
+            
+            # CHECK IF THE VEHICLE CAN RETURN TO THE DEPOT
+            returns = self.encode_block(-exp, T[1:], '>=', -self.data.depot.due_date)
+            
+            # Arcs between customers (and leaving the depot)
+            i, j = np.nonzero(pairs[:, 1:])
+            j = j + 1
+            
+            factors = np.concatenate([exp, -exp, [-self.data.depot.due_date] * vehicles])
+            clauses = np.concatenate([T[j], T[i], w[:, i, j].T], axis=-1)
+            values = self.data.service_times[i] + distances[i, j] - self.data.depot.due_date
+            
+            arcs = self.encode_block(factors, clauses, '>=', values)
+            
+            # Each customer checks its return before its arcs
+            self.constraints += arcs[:n - 1]
+            
+            for i in range(1, n):
+                start = n - 1 + (i - 1) * (n - 2)
                 
-                self.add_constraint_geq(factors, clause, value)
+                self.constraints.append(returns[i - 1])
+                self.constraints += arcs[start:start + n - 2]
         
-        # END TIME CONSTRAINTS
+            # END TIME CONSTRAINTS
         
-        # Set false the removed customers
-        w_i_j_v: list[int] = []
-        for v in range(len(self.matrices)):
-            for i in range(len(self.data.customers)):
-                for j in range(len(self.data.customers)):
-                    if i == j:
-                        continue
-                    
-                    if self.matrices[v][i, j] != -1:
-                        continue
-                    
-                    w_i_j_v.append(self.get(f'w_{i}_{j}_{v}'))    
-        self.add_constraint_eq(None, w_i_j_v, 0)
-        
-        # Set the weights
-        for v in range(len(self.matrices)):
-            for i in range(len(self.data.customers)):  
-                for j in range(len(self.data.customers)):
-                    if i == j:
-                        continue
-                    
-                    w_i_j_v = self.get(f'w_{i}_{j}_{v}')
-                    self.add_objective(round(self.data.distances[i, j]), w_i_j_v)
+        with tracer.span('model.removed_arcs'):
+            # Set false the removed customers
+            removed = pairs & (np.stack(self.matrices) == -1)
+            
+            self.add_constraint_eq(None, w[removed].tolist(), 0)
+        
+        with tracer.span('model.objective'):
+            # Set the weights
+            self.add_objectives(distances[pairs], w[:, pairs])
+        
+        tracer.count('solver.variables', self.counter - 1)
+        tracer.count('solver.constraints', len(self.constraints))
         
     @timer
     def run(self) -> tuple[float, list[Route]]:
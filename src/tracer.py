@@ -0,0 +1,159 @@
+import json
+import tracemalloc
+
+from os import getpid
+from time import perf_counter_ns
+
+class Span:
+    ''' Class representing a timed (and optionally memory traced) region '''
+
+    __slots__ = ('tracer', 'name', 'args', 'start', 'memory', 'peak', 'memory_peak')
+
+    def __init__(self, tracer: 'Tracer', name: str, args: dict):
+        self.tracer = tracer # Owner tracer
+        self.name = name # Span name
+        self.args = args # Extra data exported with the span
+
+        self.start = 0 # Start time (ns)
+        self.memory = 0 # Traced memory at the start (bytes)
+        self.peak = 0 # Peak traced memory seen before the last nested span and in the nested spans (bytes)
+        self.memory_peak: int | None = None # Peak memory allocated during the span (bytes, set on exit)
+
+    def __enter__(self):
+        stack = self.tracer.stack
+
+        if self.tracer.trace_memory:
+            memory, peak = tracemalloc.get_traced_memory()
+
+            # Keep the parent peak before resetting it for this span
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, peak)
+
+            tracemalloc.reset_peak()
+
+            self.memory = memory
+
+        stack.append(self)
+
+        self.start = perf_counter_ns()
+
+        return self
+
+    def __exit__(self, *exc):
+        end = perf_counter_ns()
+
+        self.tracer.stack.pop()
+
+        event = {
+            'name': self.name,
+            'ph': 'X',
+            'ts': (self.start - self.tracer.origin) / 1000,
+            'dur': (end - self.start) / 1000,
+            'pid': getpid(),
+            'tid': 0,
+        }
+
+        args = dict(self.args)
+
+        if self.tracer.trace_memory:
+            peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+
+            # The parent peak was reset when this span started, so it gets the peak of this span
+            if self.tracer.stack:
+                self.tracer.stack[-1].peak = max(self.tracer.stack[-1].peak, peak)
+
+            self.memory_peak = peak - self.memory
+
+            args['memory_peak'] = self.memory_peak
+
+        if args:
+            event['args'] = args
+
+        self.tracer.events.append(event)
+
+        return False
+
+class NullSpan:
+    ''' Span used while the tracer is disabled '''
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_SPAN = NullSpan()
+
+class Tracer:
+    ''' Class for collecting nested spans and counters of the pipeline '''
+
+    def __init__(self):
+        self.enabled = False # Collect spans and counters
+        self.trace_memory = False # Record the memory peak of each span
+
+        self.origin = perf_counter_ns() # Reference time (ns)
+
+        self.stack: list[Span] = [] # Open spans
+        self.events: list[dict] = [] # Closed spans (trace events)
+        self.counters: dict[str, int] = {} # Counters by name
+
+    def enable(self, trace_memory: bool = False):
+        ''' Enable the tracer '''
+
+        self.enabled = True
+        self.trace_memory = trace_memory
+
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def disable(self):
+        ''' Disable the tracer '''
+
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+        self.enabled = False
+        self.trace_memory = False
+
+    def reset(self):
+        ''' Clear the spans and counters collected '''
+
+        self.origin = perf_counter_ns()
+
+        self.stack.clear()
+        self.events.clear()
+        self.counters.clear()
+
+    def span(self, name: str, **args) -> Span | NullSpan:
+        ''' Get a span for a region (use it as a context manager) '''
+
+        if not self.enabled:
+            return NULL_SPAN
+
+        return Span(self, name, args)
+
+    def count(self, name: str, value: int = 1):
+        ''' Increment a counter '''
+
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def totals(self) -> dict[str, float]:
+        ''' Get the total time (seconds) spent in each span name '''
+
+        totals: dict[str, float] = {}
+
+        for event in self.events:
+            totals[event['name']] = totals.get(event['name'], 0) + event['dur'] / 1e6
+
+        return totals
+
+    def export(self, file: str):
+        ''' Export the spans (Chrome trace event format) and the counters to a JSON file '''
+
+        with open(file, 'w') as output:
+            json.dump({'traceEvents': self.events, 'counters': self.counters}, output)
+
+tracer = Tracer()
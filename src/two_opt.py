@@ -1,29 +1,106 @@
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor
+
+from src.data import Data
 from src.route import Route
+from src.array_route import ArrayRoute
+from src.shared import SharedArray
 from src.utils import timer
 
 class TwoOpt:
     ''' Class for the 2-opt heuristic '''
-    
-    def __init__(self, routes: list[Route]):
+
+    def __init__(
+        self,
+        routes: list[Route],
+        compact: bool = False,
+        neighbors: int | None = None,
+        n_jobs: int | None = None
+    ):
         self.routes = routes
-    
+        self.compact = compact # Apply the moves in place on array routes
+        self.neighbors = neighbors # Number of neighbors for first-improvement moves (None for best-improvement)
+        self.n_jobs = n_jobs # Number of worker processes (None to improve the routes in this process, the default: the pool start-up outweighs the short Solomon routes)
+
+        self.neighbor_lists: np.ndarray | None = None # Nearest neighbors of each customer
+
+    def improve(self, route: Route) -> Route:
+        ''' Improve a single route '''
+
+        if self.neighbors is not None:
+            if self.neighbor_lists is None:
+                self.neighbor_lists = route.data.neighbors(self.neighbors)
+
+            array_route = ArrayRoute.from_route(route)
+
+            array_route.first_improvement(self.neighbor_lists)
+
+            return array_route.to_route(route.data)
+
+        if self.compact:
+            array_route = ArrayRoute.from_route(route)
+
+            while array_route.best_reversed():
+                pass
+
+            return array_route.to_route(route.data)
+
+        while True:
+            best = route.best_reversed()
+
+            if best.cost < route.cost:
+                route = best
+            else:
+                break
+
+        return route
+
+    def run_parallel(self) -> list[Route]:
+        ''' Improve the routes across worker processes (only the distance matrix is shared, each worker rebuilds the customers) '''
+
+        data = self.routes[0].data
+
+        with SharedArray(data.distances) as distances, SharedArray(data.rows()) as rows:
+            initargs = (
+                distances.spec,
+                rows.spec,
+                data.name,
+                data.max_vehicle_number,
+                data.vehicle_capacity,
+                self.compact,
+                self.neighbors
+            )
+
+            with ProcessPoolExecutor(self.n_jobs, initializer=init_worker, initargs=initargs) as executor:
+                # Only the customer ids travel to the workers and back
+                values = list(executor.map(improve_worker, [route.value for route in self.routes]))
+
+        return [Route(data, value) for value in values]
+
     @timer
     def run(self) -> tuple[float, list[Route]]:
         ''' Run the 2-opt heuristic '''
-        
-        routes: list[Route] = []
-        
-        for idx in range(len(self.routes)):
-            route = self.routes[idx]
-            
-            while True:
-                best = route.best_reversed()
-                    
-                if best.cost < route.cost:
-                    route = best
-                else:
-                    break
-            
-            routes.append(route)   
-            
-        return routes
\ No newline at end of file
+
+        if self.n_jobs is not None and self.n_jobs > 1 and len(self.routes) > 1:
+            return self.run_parallel()
+
+        return [self.improve(route) for route in self.routes]
+
+# Worker process state (set once by init_worker)
+worker: dict = {}
+
+def init_worker(distances_spec, rows_spec, name, max_vehicle_number, vehicle_capacity, compact, neighbors):
+    ''' Attach the shared arrays in a worker process (the customers and their arrays are rebuilt from the rows) '''
+
+    distances_memory, distances = SharedArray.attach(distances_spec)
+    rows_memory, rows = SharedArray.attach(rows_spec)
+
+    worker['memory'] = [distances_memory, rows_memory]
+    worker['data'] = Data.from_rows(name, max_vehicle_number, vehicle_capacity, rows, distances)
+    worker['two_opt'] = TwoOpt([], compact, neighbors)
+
+def improve_worker(value: list[int]) -> list[int]:
+    ''' Improve a route given by its customer ids in a worker process '''
+
+    return worker['two_opt'].improve(Route(worker['data'], value)).value
@@ -1,17 +1,25 @@
 import numpy as np
 import matplotlib.pyplot as plt
 
+from matplotlib.figure import Figure
+from matplotlib.collections import LineCollection
+
 import numpy as np
 
-from time import time
+from time import perf_counter
+from functools import wraps
+
+from src.tracer import tracer
 
 def timer(func):
-    ''' Decorator to measure the execution time of a function '''
+    ''' Decorator to measure the execution time of a function (traced as a span) '''
     
+    @wraps(func)
     def wrapper(*args, **kwargs):
-        start = time()
-        result = func(*args, **kwargs)
-        end = time()
+        with tracer.span(func.__qualname__):
+            start = perf_counter()
+            result = func(*args, **kwargs)
+            end = perf_counter()
         
         if isinstance(result, tuple):
             return end - start, *result
@@ -25,32 +33,56 @@ def distance(a: np.ndarray, b: np.ndarray) -> int:
     
     return np.linalg.norm(a - b)
 
-def plot(instance, clusters):
-    ''' Plot the instance and the clusters '''
+def plot(instance, clusters, file: str | None = None):
+    ''' Plot the instance and the clusters (saved to the file if given, shown otherwise) '''
+    
+    positions = np.array([customer.pos for customer in instance.customers])
+    demands = np.array([customer.demand for customer in instance.customers])
+    
+    routes = [[customer.id for customer in cluster if customer.id != 0] for cluster in clusters]
+    
+    title = f'{instance.name} (Cost: {sum(c.cost for c in clusters):.2f})'
     
-    plt.figure(figsize=(12, 6))
+    render(positions, routes, demands, title, file)
 
-    for i, cluster in enumerate(clusters):
-        for j in range(len(cluster) - 1):
-            c1, c2 = cluster[j], cluster[j + 1]
-            
-            plt.plot([c1.x, c2.x], [c1.y, c2.y], c='black', alpha=0.5, linestyle='--', linewidth=1)
+def render(positions: np.ndarray, routes: list[list[int]], demands: np.ndarray, title: str, file: str | None = None):
+    ''' Draw the routes (one line collection each) from the customer positions (depot first) '''
+    
+    # Figures saved to files do not need pyplot (nor a display)
+    figure = Figure(figsize=(12, 6)) if file is not None else plt.figure(figsize=(12, 6))
+    axes = figure.subplots()
 
-        c1, c2 = cluster[0], cluster[-1]
+    for i, route in enumerate(routes):
+        if not route:
+            continue
+        
+        points = positions[[0] + route + [0]]
         
-        plt.plot([instance.depot.x, c1.x], [instance.depot.y, c1.y], c='gray', linestyle='--', linewidth=1)
-        plt.plot([instance.depot.x, c2.x], [instance.depot.y, c2.y], c='gray', linestyle='--', linewidth=1)
+        # Legs between customers in black, legs from and to the depot in gray
+        colors = [(0, 0, 0, 0.5)] * (len(route) + 1)
+        colors[0] = colors[-1] = 'gray'
         
-        label = f'Route {i + 1} (Demand: {sum(c.demand for c in cluster)})'
+        axes.add_collection(LineCollection(
+            np.stack([points[:-1], points[1:]], axis=1), 
+            colors=colors, 
+            linestyles='--', 
+            linewidths=1
+        ))
         
-        plt.scatter([c.x for c in cluster], [c.y for c in cluster], label=label, zorder=3)
+        label = f'Route {i + 1} (Demand: {demands[route].sum()})'
+        
+        axes.scatter(points[1:-1, 0], points[1:-1, 1], label=label, zorder=3)
 
     # PLOT DEPOT (MARKER)
-    plt.scatter(instance.depot.x, instance.depot.y, c='black', s=100, marker='X', label='Depot', zorder=4)
+    axes.scatter(positions[0, 0], positions[0, 1], c='black', s=100, marker='X', label='Depot', zorder=4)
 
-    plt.legend()
+    axes.legend()
 
-    plt.title(f'{instance.name} (Cost: {sum(c.cost for c in clusters):.2f})')
-    plt.xlabel('X')
-    plt.ylabel('Y')
-    plt.show()
\ No newline at end of file
+    axes.set_title(title)
+    axes.set_xlabel('X')
+    axes.set_ylabel('Y')
+    
+    if file is not None:
+        figure.savefig(file)
+    else:
+        plt.show()
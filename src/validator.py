@@ -0,0 +1,117 @@
+import numpy as np
+
+from src.data import Data
+from src.route import Route
+from src.utils import timer
+
+class Validator:
+    ''' Class for validating solutions given as flat customer arrays with route offsets (many plans at once) '''
+
+    def __init__(self, data: Data):
+        self.data = data # CVRPTW instance
+
+    @staticmethod
+    def flatten(routes: list[Route]) -> tuple[np.ndarray, np.ndarray]:
+        ''' Get the flat customer ids (depot visits dropped) and the route offsets of a list of routes '''
+
+        values = [[customer for customer in route.value if customer != 0] for route in routes]
+
+        offsets = np.cumsum([0] + [len(value) for value in values])
+
+        return np.array([customer for value in values for customer in value], dtype=int), offsets
+
+    @timer
+    def run(self, values: np.ndarray, offsets: np.ndarray, plans: np.ndarray | None = None) -> tuple[float, dict]:
+        ''' Run the validation (plans are offsets over the routes, a single plan if None) '''
+
+        data = self.data
+        distances = data.distances
+
+        n = len(data.customers)
+
+        values = np.asarray(values, dtype=int)
+        offsets = np.asarray(offsets, dtype=int)
+
+        if plans is None:
+            plans = np.array([0, len(offsets) - 1])
+
+        lengths = np.diff(offsets)
+
+        routes = len(lengths)
+        route_of = np.repeat(np.arange(routes), lengths)
+        position = np.arange(len(values)) - offsets[:-1][route_of]
+
+        # Ids outside the customers are reported and checked as the depot
+        invalid = (values <= 0) | (values >= n)
+        values = np.where(invalid, 0, values)
+
+        first = position == 0
+        last = position == lengths[route_of] - 1
+
+        prev = np.where(first, 0, np.roll(values, 1))
+
+        # Distance and time from the previous visit (the depot has no service time)
+        legs = distances[prev, values]
+        times = legs + np.where(first, 0, data.service_times[prev])
+
+        # Time elapsed to reach each visit without waiting (D), segmented by route
+        elapsed = np.cumsum(times)
+        elapsed -= np.concatenate([[0], elapsed])[offsets[:-1]][route_of]
+
+        # Start of service: D_k + max(0, max over j <= k of (ready_j - D_j)), leaving the depot at 0
+        keys = np.full((routes, max(lengths.max(initial=0), 1)), -np.inf)
+        keys[route_of, position] = data.ready_times[values] - elapsed
+        keys = np.maximum.accumulate(keys, axis=1)
+
+        before = np.where(first, -np.inf, keys[route_of, np.maximum(position - 1, 0)])
+
+        arrivals = elapsed + np.maximum(before, 0)
+        starts = elapsed + np.maximum(keys[route_of, position], 0)
+
+        lateness = np.maximum(arrivals - data.due_dates[values], 0)
+
+        # Return to the depot after the last visit (0 for empty routes)
+        returns = np.zeros(routes)
+        returns[route_of[last]] = (starts + data.service_times[values] + distances[values, 0])[last]
+
+        costs = np.bincount(route_of, weights=legs, minlength=routes)
+        costs[route_of[last]] += distances[values, 0][last]
+
+        loads = np.bincount(route_of, weights=data.demands[values], minlength=routes)
+
+        excess = np.maximum(loads - data.vehicle_capacity, 0)
+        late = np.bincount(route_of, weights=lateness > 0, minlength=routes).astype(int)
+        return_lateness = np.maximum(returns - data.depot.due_date, 0)
+
+        feasible = (excess == 0) & (late == 0) & (return_lateness == 0)
+        feasible &= np.bincount(route_of, weights=invalid, minlength=routes) == 0
+
+        # Coverage of each plan (visits of each customer)
+        plan_of = np.repeat(np.arange(len(plans) - 1), np.diff(plans))
+
+        coverage = np.bincount(plan_of[route_of] * n + values, minlength=(len(plans) - 1) * n)
+        coverage = coverage.reshape(len(plans) - 1, n)
+        coverage[:, 0] = 0
+
+        missing = (coverage[:, 1:] == 0).sum(axis=1)
+        repeated = (coverage[:, 1:] > 1).sum(axis=1)
+
+        plan_feasible = np.bincount(plan_of, weights=~feasible, minlength=len(plans) - 1) == 0
+
+        return {
+            'routes': {
+                'cost': costs,
+                'load': loads,
+                'excess': excess,
+                'late': late,
+                'lateness': np.bincount(route_of, weights=lateness, minlength=routes),
+                'return': returns,
+                'return_lateness': return_lateness,
+                'feasible': feasible,
+            },
+            'cost': np.bincount(plan_of, weights=costs, minlength=len(plans) - 1),
+            'coverage': coverage,
+            'missing': missing,
+            'repeated': repeated,
+            'valid': plan_feasible & (missing == 0) & (repeated == 0),
+        }
@@ -0,0 +1,21 @@
+from src.tracer import Tracer
+
+def test_nested_span_memory_peak():
+    ''' A parent span keeps the peak of a child allocated before a grandchild started '''
+
+    tracer = Tracer()
+    tracer.enable(trace_memory=True)
+
+    try:
+        with tracer.span('parent') as parent:
+            with tracer.span('child') as child:
+                block = bytearray(10_000_000)
+                del block
+
+                with tracer.span('grandchild'):
+                    pass
+    finally:
+        tracer.disable()
+
+    assert child.memory_peak >= 10_000_000
+    assert parent.memory_peak >= child.memory_peak